@@ -4,8 +4,10 @@ from homeassistant.core import HomeAssistant
 from .const import DOMAIN
 import logging
 from typing import Final
-from homeassistant.helpers.entity import Entity
-from homeassistant.helpers.entity_registry import async_get as get_entity_registry
+from homeassistant.helpers import entity_registry as er
+
+from .sensor import EpgDataUpdateCoordinator, get_expected_unique_ids
+from .watchlist import Watchlist
 
 
 _LOGGER: Final = logging.getLogger(__name__)
@@ -20,22 +22,35 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry):
     return True
 async def update_listener(hass: HomeAssistant, entry: ConfigEntry) -> None:
     """Update listener."""
+    coordinator = hass.data[DOMAIN].get(entry.entry_id)
+    # Channel selection and display options are applied to the running entry
+    if isinstance(
+        coordinator, EpgDataUpdateCoordinator
+    ) and await coordinator.async_apply_options(entry.options):
+        return
     await hass.config_entries.async_reload(entry.entry_id)
 
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry):
     """Unload a config entry."""
-    hass.data[DOMAIN].pop(entry.entry_id, None)
-    registry = get_entity_registry(hass)
-    entities_to_remove =[]
-    for entity in registry.entities:
-        reg_entity=registry.entities.get(entity)
-        if reg_entity.config_entry_id == entry.entry_id and reg_entity.unique_id not in entry.options["selected_channels"]:
-            entities_to_remove.append(entity)
-    try:
-        for entity in entities_to_remove:
-            await registry.async_remove(entity)
-    except Exception as ignore:
-        _LOGGER.debug(ignore)
+    coordinator = hass.data[DOMAIN].pop(entry.entry_id, None)
+    # Only look at this entry's entities, not the whole registry
+    expected = get_expected_unique_ids(entry, getattr(coordinator, "data", None))
+    if expected is not None:
+        registry = er.async_get(hass)
+        stale = [
+            reg_entity.entity_id
+            for reg_entity in er.async_entries_for_config_entry(
+                registry, entry.entry_id
+            )
+            if reg_entity.unique_id not in expected
+        ]
+        for entity_id in stale:
+            _LOGGER.debug("Removing entity %s of unselected channel", entity_id)
+            registry.async_remove(entity_id)
 
     await hass.config_entries.async_forward_entry_unload(entry, "sensor")
     return True
+
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Delete the stored watchlist of a removed entry."""
+    await Watchlist(hass, entry.entry_id).async_remove()
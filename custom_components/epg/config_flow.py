@@ -1,13 +1,16 @@
 from homeassistant import config_entries
 import voluptuous as vol
+import asyncio
 import os
+import re
 import logging
 import aiohttp
 from typing import Final
 from homeassistant.helpers.aiohttp_client import async_get_clientsession
 from homeassistant.exceptions import PlatformNotReady
 from homeassistant.core import HomeAssistant
-from .const import DOMAIN
+from .const import CHANNEL_LIST_TIMEOUT, DOMAIN
+from .fetcher import cache_file_name, is_custom_source, local_path, source_title
 from homeassistant.core import callback
 from homeassistant.helpers import config_validation as cv
 
@@ -31,30 +34,62 @@ first_step_schema = vol.Schema(
         vol.Required("full_schedule", default=False): bool,
         vol.Required("generated", default=False): bool,
         vol.Required("ignore_timezone_offset", default=False): bool,
+        vol.Optional("additional_sources", default=""): str,
+        vol.Optional("max_programmes", default=0): cv.positive_int,
+        vol.Optional("max_description_length", default=0): cv.positive_int,
     }
 )
 
 
+def _split_sources(text) -> list[str]:
+    """Split a comma or newline separated list of guide sources."""
+    sources = (source.strip() for source in re.split(r"[,\n]", text or ""))
+    return [source for source in sources if source]
+
+
+def _custom_file_path(source: str) -> str:
+    """Return where the guide of a URL or local path source is read from."""
+    path = local_path(source)
+    if path is not None:
+        return path
+    return os.path.join(os.path.dirname(__file__), f"userfiles/{cache_file_name(source)}")
+
+
 async def fetch_channel_list(hass: HomeAssistant, url):
     """Fetch the channel_list from the URL"""
     session = async_get_clientsession(hass)
     try:
-        response = await session.get(url)
+        response = await session.get(
+            url, timeout=aiohttp.ClientTimeout(total=CHANNEL_LIST_TIMEOUT)
+        )
         response.raise_for_status()
         data = await response.text()
         return data
-    except aiohttp.ClientError as error:
+    except (aiohttp.ClientError, asyncio.TimeoutError) as error:
         _LOGGER.error("Error fetching guide: %s", error)
 
 
 async def _fetch_channels(hass: HomeAssistant, user_data):
-    """Fetch the list of channels from the guide."""
-    file = "".join(user_data["file_name"].split()).lower()
-    channels = await fetch_channel_list(
-        hass, f"https://www.open-epg.com/files/{file}.xml.txt"
+    """Fetch the list of channels from the guide and any additional sources."""
+    files = [
+        file
+        for file in (user_data["file_name"], *user_data.get("additional_sources", []))
+        if not is_custom_source(file)
+    ]
+    responses = await asyncio.gather(
+        *(
+            fetch_channel_list(
+                hass,
+                f"https://www.open-epg.com/files/{''.join(file.split()).lower()}.xml.txt",
+            )
+            for file in files
+        )
     )
-
-    return channels.splitlines() if channels else None
+    if not responses[0]:
+        return None
+    return [
+        line for channels in responses if channels for line in channels.splitlines()
+    ]
 
 
 class EPGConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
@@ -71,7 +106,12 @@ class EPGConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
         errors = {}
 
         if user_input is not None:
-            if not user_input.get("generated"):
+            user_input["additional_sources"] = _split_sources(
+                user_input.get("additional_sources")
+            )
+            if not user_input.get("generated") and not is_custom_source(
+                user_input["file_name"]
+            ):
                 self.available_channels = await _fetch_channels(self.hass, user_input)
                 if not self.available_channels:
                     errors["base"] = "invalid_file_name"
@@ -93,6 +133,15 @@ class EPGConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
         """Handle the channel selection step."""
         errors = {}
 
+        if is_custom_source(self.user_data["file_name"]):
+            # URLs and local files are tracked whole, like generated files
+            self.user_data["file_path"] = _custom_file_path(self.user_data["file_name"])
+            return self.async_create_entry(
+                title=source_title(self.user_data["file_name"]),
+                data=self.user_data,
+                options=self.user_data,
+            )
+
         if self.user_data["generated"]:
             file_name = os.path.basename(self.user_data["file_name"])
             self.user_data["file_path"] = os.path.join(
@@ -158,6 +207,9 @@ class EPGOptionsFlowHandler(config_entries.OptionsFlow):
         errors = {}
 
         if user_input is not None:
+            user_input["additional_sources"] = _split_sources(
+                user_input.get("additional_sources")
+            )
             self.user_data.update(user_input)
             return await self.async_step_channels()
 
@@ -176,6 +228,17 @@ class EPGOptionsFlowHandler(config_entries.OptionsFlow):
                     "ignore_timezone_offset",
                     default=self.defult_data.get("ignore_timezone_offset"),
                 ): bool,
+                vol.Optional(
+                    "additional_sources",
+                    default=", ".join(self.defult_data.get("additional_sources", [])),
+                ): str,
+                vol.Optional(
+                    "max_programmes", default=self.defult_data.get("max_programmes", 0)
+                ): cv.positive_int,
+                vol.Optional(
+                    "max_description_length",
+                    default=self.defult_data.get("max_description_length", 0),
+                ): cv.positive_int,
             }
         )
 
@@ -191,6 +254,10 @@ class EPGOptionsFlowHandler(config_entries.OptionsFlow):
 
         selected_channels = self.defult_data.get("selected_channels", [])
 
+        if is_custom_source(self.user_data["file_name"]):
+            self.user_data["file_path"] = _custom_file_path(self.user_data["file_name"])
+            return self.async_create_entry(title="", data=self.user_data)
+
         if self.user_data["generated"]:
             file_name = os.path.basename(self.user_data["file_name"])
             self.user_data["file_path"] = os.path.join(
@@ -205,13 +272,8 @@ class EPGOptionsFlowHandler(config_entries.OptionsFlow):
                 os.path.dirname(__file__),
                 f"userfiles/{''.join(file_name.split()).lower()}.xml",
             )
-            entry = self.hass.config_entries.async_get_entry(self.config_entry.entry_id)
-            if entry:
-                self.hass.config_entries.async_update_entry(
-                    entry, data=self.user_data, options=self.user_data
-                )
-                await self.hass.config_entries.async_reload(entry.entry_id)
-
+            # Saving the options triggers the update listener, which applies
+            # a channel change to the running entry instead of reloading it
             return self.async_create_entry(title="", data=self.user_data)
 
         if not self.available_channels:
@@ -21,7 +21,33 @@ UPDATE_TOPIC: Final = f"{DOMAIN}_update"
 
 ICON: Final = "mdi:television-guide"
 
+# Options applied to a running entry without reloading it
+LIVE_OPTIONS: Final = frozenset(
+    {"selected_channels", "full_schedule", "max_programmes", "max_description_length"}
+)
+
 MIN_TIME_BETWEEN_UPDATES: Final = timedelta(days=1)
+# Downloaded guides are reused from the cache file for this long
+CACHE_MAX_AGE: Final = timedelta(hours=24)
+
+# Guide download budget
+FETCH_CONNECT_TIMEOUT: Final = 15  # seconds
+FETCH_READ_TIMEOUT: Final = 30  # seconds without receiving any data
+FETCH_TOTAL_TIMEOUT: Final = 300  # seconds for the whole body
+FETCH_MAX_BYTES: Final = 150 * 1024 * 1024
+FETCH_ATTEMPTS: Final = 3
+FETCH_BACKOFF_BASE: Final = 2  # seconds, doubled on every retry
+FETCH_BACKOFF_MAX: Final = 60  # seconds
+# Wait this long after a failed download before trying the network again
+FETCH_FAILURE_COOLDOWN: Final = timedelta(minutes=15)
+# The channel list is small and the setup dialog waits for it
+CHANNEL_LIST_TIMEOUT: Final = 20  # seconds
+# How often local guide files are checked for changes
+LOCAL_SOURCE_POLL_INTERVAL: Final = timedelta(seconds=1)
+# Reject a download with fewer programmes than this share of the previous one
+MIN_PROGRAMME_RATIO: Final = 0.2
+# Fired when a programme matched by the watchlist starts
+EVENT_PROGRAMME_STARTING: Final = "epg_programme_starting"
 
 CHANNEL_SCHEMA: Final = vol.Schema(
     {
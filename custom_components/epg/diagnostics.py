@@ -0,0 +1,30 @@
+"""Diagnostics support for the EPG integration."""
+
+from __future__ import annotations
+
+from typing import Any
+
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+from .const import DOMAIN
+from .sensor import EpgDataUpdateCoordinator
+
+# Generated file codes are personal to the open-epg.com account, and custom
+# sources can be URLs with credentials or tokens, so sources are never shown
+TO_REDACT = {"file_name", "file_path", "additional_sources"}
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, entry: ConfigEntry
+) -> dict[str, Any]:
+    """Return diagnostics for a config entry."""
+    options = async_redact_data(dict(entry.options), TO_REDACT)
+
+    diagnostics: dict[str, Any] = {"options": options}
+    coordinator = hass.data.get(DOMAIN, {}).get(entry.entry_id)
+    if isinstance(coordinator, EpgDataUpdateCoordinator):
+        diagnostics["last_update_success"] = coordinator.last_update_success
+        diagnostics["stats"] = coordinator.stats.as_dict()
+    return diagnostics
@@ -0,0 +1,207 @@
+"""Guide downloads with bounded timeouts, retries and content validation."""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import logging
+import os
+import random
+import re
+import time
+from typing import Final
+from urllib.parse import urlsplit
+
+import aiohttp
+
+from .const import (
+    FETCH_ATTEMPTS,
+    FETCH_BACKOFF_BASE,
+    FETCH_BACKOFF_MAX,
+    FETCH_CONNECT_TIMEOUT,
+    FETCH_MAX_BYTES,
+    FETCH_READ_TIMEOUT,
+    FETCH_TOTAL_TIMEOUT,
+)
+
+_LOGGER: Final = logging.getLogger(__name__)
+
+_CHUNK_SIZE: Final = 64 * 1024
+_ROOT_RE: Final = re.compile(rb"<tv[\s>/]")
+
+
+def is_url(source: str) -> bool:
+    """Return True if source is an arbitrary http(s) guide URL."""
+    return source.lower().startswith(("http://", "https://"))
+
+
+def local_path(source: str) -> str | None:
+    """Return the filesystem path of a local guide source, or None."""
+    if source.lower().startswith("file://"):
+        return source[len("file://") :]
+    if os.path.isabs(source):
+        return source
+    return None
+
+
+def is_custom_source(source: str) -> bool:
+    """Return True if source is not an open-epg.com file name or code."""
+    return is_url(source) or local_path(source) is not None
+
+
+def source_title(source: str) -> str:
+    """Return a display name for a source that leaves out credentials.
+
+    URLs are reduced to the last part of their path (or their host), so
+    user info and query tokens never end up in entity names.
+    """
+    if is_url(source):
+        parts = urlsplit(source)
+        return os.path.basename(parts.path.rstrip("/")) or parts.hostname or "guide"
+    return os.path.basename(source)
+
+
+def cache_file_name(url: str) -> str:
+    """Return a stable cache file name for a custom guide URL."""
+    return f"{hashlib.sha1(url.encode()).hexdigest()[:16]}.xml"
+
+
+class GuideFetchError(Exception):
+    """Raised when no usable guide could be downloaded."""
+
+
+class GuideValidationError(GuideFetchError):
+    """Raised when a downloaded body is not a complete XMLTV document."""
+
+
+class FetchResult:
+    """Outcome of a successful guide download."""
+
+    def __init__(
+        self,
+        data: bytearray | None,
+        not_modified: bool,
+        attempts: int,
+        seconds: float,
+        channels: int = 0,
+        programmes: int = 0,
+    ) -> None:
+        """Initialize the result."""
+        self.data = data
+        self.not_modified = not_modified
+        self.attempts = attempts
+        self.seconds = seconds
+        self.channels = channels
+        self.programmes = programmes
+
+
+def validate_guide(data: bytes | bytearray, min_programmes: int = 1) -> tuple[int, int]:
+    """Check data looks like a complete XMLTV document.
+
+    Returns the number of channels and programmes found. The root element and
+    its closing tag catch truncated bodies without a full parse; the parser
+    still rejects anything malformed later on.
+    """
+    if not _ROOT_RE.search(data[:4096]):
+        raise GuideValidationError("Response is not an XMLTV document")
+    # Only look at the tail: rstrip() on the whole body would copy it
+    if not data[-64:].rstrip().endswith(b"</tv>"):
+        raise GuideValidationError("Response is truncated (no closing </tv>)")
+    channels = data.count(b"<channel ")
+    programmes = data.count(b"<programme ")
+    if not channels:
+        raise GuideValidationError("Response contains no channels")
+    if programmes < min_programmes:
+        raise GuideValidationError(
+            f"Response contains {programmes} programmes, expected at least {min_programmes}"
+        )
+    return channels, programmes
+
+
+def _backoff(attempt: int) -> float:
+    """Return the jittered delay before retry number attempt."""
+    delay = min(FETCH_BACKOFF_MAX, FETCH_BACKOFF_BASE * 2 ** (attempt - 1))
+    return delay * random.uniform(0.5, 1.5)
+
+
+async def _async_read_body(
+    response: aiohttp.ClientResponse, max_bytes: int
+) -> bytearray:
+    """Read the response body, refusing to buffer more than max_bytes.
+
+    The buffer is returned as is; copying a guide of up to max_bytes into
+    bytes would hold it in memory twice.
+    """
+    if response.content_length and response.content_length > max_bytes:
+        raise GuideFetchError(
+            f"Guide is {response.content_length} bytes, limit is {max_bytes}"
+        )
+    body = bytearray()
+    async for chunk in response.content.iter_chunked(_CHUNK_SIZE):
+        body += chunk
+        if len(body) > max_bytes:
+            raise GuideFetchError(f"Guide exceeds the {max_bytes} byte limit")
+    return body
+
+
+async def async_fetch_guide(
+    session: aiohttp.ClientSession,
+    url: str,
+    if_modified_since: str | None = None,
+    min_programmes: int = 1,
+    max_bytes: int = FETCH_MAX_BYTES,
+    attempts: int = FETCH_ATTEMPTS,
+) -> FetchResult:
+    """Download and validate a guide, retrying transient failures."""
+    timeout = aiohttp.ClientTimeout(
+        total=FETCH_TOTAL_TIMEOUT,
+        connect=FETCH_CONNECT_TIMEOUT,
+        sock_read=FETCH_READ_TIMEOUT,
+    )
+    headers = {}
+    if if_modified_since:
+        headers["If-Modified-Since"] = if_modified_since
+
+    for attempt in range(1, attempts + 1):
+        started = time.perf_counter()
+        try:
+            async with session.get(url, headers=headers, timeout=timeout) as response:
+                if response.status == 304:
+                    return FetchResult(
+                        None, True, attempt, time.perf_counter() - started
+                    )
+                response.raise_for_status()
+                data = await _async_read_body(response, max_bytes)
+            channels, programmes = validate_guide(data, min_programmes)
+            return FetchResult(
+                data,
+                False,
+                attempt,
+                time.perf_counter() - started,
+                channels,
+                programmes,
+            )
+        except aiohttp.ClientResponseError as err:
+            # Client errors such as 404 will not go away by retrying
+            if err.status < 500 and err.status != 429:
+                raise GuideFetchError(f"Error fetching {url}: {err}") from err
+            error: Exception = err
+        except (aiohttp.ClientError, asyncio.TimeoutError, GuideValidationError) as err:
+            error = err
+
+        if attempt == attempts:
+            raise GuideFetchError(
+                f"Giving up on {url} after {attempts} attempts: {error}"
+            ) from error
+        delay = _backoff(attempt)
+        _LOGGER.warning(
+            "Fetching %s failed (attempt %s/%s): %s. Retrying in %.1fs",
+            url,
+            attempt,
+            attempts,
+            error,
+            delay,
+        )
+        await asyncio.sleep(delay)
+
+    raise GuideFetchError(f"No attempts made to fetch {url}")
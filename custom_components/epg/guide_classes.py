@@ -1,12 +1,35 @@
+from __future__ import annotations
+
+from bisect import bisect_left, bisect_right
 from datetime import datetime, date, timedelta
-from bs4 import BeautifulSoup
+from io import BytesIO
+from lxml import etree
 import time
 import logging
+import sys
 import pytz
 
 _LOGGER = logging.getLogger(__name__)
 
 
+class TickContext:
+    """The instant every channel query of one coordinator tick agrees on."""
+
+    def __init__(self, time_zone, ignore_offset=False, now=None) -> None:
+        """Compute now, the local date and the offset once."""
+        if now is None:
+            now = time_zone.localize(datetime.now())
+        self.now = now
+        self.today = now.date()
+        self.utc_offset = 0 if ignore_offset else now.utcoffset().total_seconds() / 3600
+        self.offset = timedelta(hours=self.utc_offset)
+        # "now" shifted by the utc offset, used to fix programmes on the wrong day
+        self.shifted_now = now + self.offset
+        _LOGGER.debug(
+            "now without utc_offset: %s utc_offset: %s", now, self.utc_offset
+        )
+
+
 class Programme:
     def __init__(self, start, stop, title, sub_title, desc, time_zone) -> None:
         """Initialize the sensor."""
@@ -19,9 +42,20 @@ class Programme:
         self.title = title
         self.desc = desc
         self.sub_title = sub_title
-        _LOGGER.debug(
-            f"{self.title}\n{self.desc}\nstart: {self._start}now: {self._stop} start_hour: {self.start_hour} end_hour: {self.end_hour}"
-        )
+        if _LOGGER.isEnabledFor(logging.DEBUG):
+            _LOGGER.debug(
+                "%s\n%s\nstart: %s now: %s start_hour: %s end_hour: %s",
+                self.title,
+                self.desc,
+                self._start,
+                self._stop,
+                self.start_hour,
+                self.end_hour,
+            )
+
+    def key(self) -> tuple:
+        """Return what identifies the programme when comparing guides."""
+        return (self._start, self._stop, self.title, self.sub_title, self.desc)
 
     def title(self):
         """Return the title of the program."""
@@ -50,6 +84,7 @@ class Channel:
     def __init__(self, id, name, icon, lang, time_zone, ignore_offset) -> None:
         """Initialize the sensor."""
         self._programmes = []
+        self._starts = None
         self._name = name
         self.id = id
         self._icon = icon
@@ -69,6 +104,114 @@ class Channel:
     def add_programme(self, programme) -> None:
         """Initialize the sensor."""
         self._programmes.append(programme)
+        self._starts = None
+
+    def programme_count(self) -> int:
+        return len(self._programmes)
+
+    def sort_programmes(self) -> None:
+        self._programmes.sort(key=lambda programme: programme._start)
+        self._starts = None
+
+    def get_programmes_between(self, start: datetime, end: datetime) -> list:
+        """Return the programmes airing at any point in [start, end).
+
+        Uses binary search on the sorted start times, so the cost depends on
+        the size of the window rather than the schedule.
+        """
+        if self._starts is None:
+            self._starts = [programme._start for programme in self._programmes]
+        first = max(bisect_right(self._starts, start) - 1, 0)
+        last = bisect_left(self._starts, end)
+        return [
+            programme
+            for programme in self._programmes[first:last]
+            if programme._stop > start
+        ]
+
+    def merge_programmes(self, programmes) -> int:
+        """Add programmes that do not overlap any already scheduled one.
+
+        Used to fill this channel from a lower priority source; returns the
+        number of programmes added.
+        """
+        if not self._programmes:
+            # Nothing to overlap; the other schedule is already sorted
+            self._programmes = list(programmes)
+            self._starts = None
+            return len(programmes)
+        starts = [programme._start for programme in self._programmes]
+        added = []
+        for programme in programmes:
+            index = bisect_right(starts, programme._start)
+            if index and self._programmes[index - 1]._stop > programme._start:
+                continue
+            if index < len(starts) and starts[index] < programme._stop:
+                continue
+            added.append(programme)
+        if added:
+            self._programmes.extend(added)
+            self.sort_programmes()
+        return len(added)
+
+    def diff_programmes(self, programmes) -> list[Programme] | None:
+        """Return the schedule that replaces this one, or None if unchanged.
+
+        Programmes already ended are dropped from the head, the span both
+        schedules agree on is kept as is and only the differing tail is
+        replaced. The channel itself is not changed.
+        """
+        old = self._programmes
+        if not programmes:
+            return [] if old else None
+        starts = [programme._start for programme in old]
+        head = bisect_left(starts, programmes[0]._start)
+        matching = 0
+        for old_programme, new_programme in zip(old[head:], programmes):
+            if old_programme.key() != new_programme.key():
+                break
+            matching += 1
+        if head == 0 and matching == len(old) == len(programmes):
+            return None
+        return old[head : head + matching] + programmes[matching:]
+
+    def update_programmes(self, programmes) -> bool:
+        """Replace the schedule with programmes; return True if it changed."""
+        updated = self.diff_programmes(programmes)
+        if updated is None:
+            return False
+        self.set_programmes(updated)
+        return True
+
+    def set_programmes(self, programmes) -> None:
+        """Replace the schedule with already sorted programmes."""
+        self._programmes = programmes
+        self._starts = None
+
+    def update_metadata(self, other: Channel) -> bool:
+        """Take name and icon from other; return True if either changed."""
+        if (self._name, self._icon) == (other._name, other._icon):
+            return False
+        self._name = other._name
+        self._icon = other._icon
+        return True
+
+    def state_key(self, ctx: TickContext):
+        """Return a value that changes whenever the sensor state would.
+
+        Schedules are sorted, so the current programme, the first programme
+        not yet ended and the date are enough to tell.
+        """
+        upcoming = next(
+            (programme for programme in self._programmes if programme._stop >= ctx.now),
+            None,
+        )
+        return (
+            self.get_current_programme(ctx),
+            upcoming,
+            ctx.today,
+            ctx.shifted_now.date(),
+        )
 
     def get_programmes(self) -> dict[str, str]:
         ret = {}
@@ -86,9 +229,16 @@ class Channel:
             )
         return ret
 
-    def get_programmes_from_now_by_end(self) -> dict[str, str]:
+    def _context(self, ctx: TickContext | None) -> TickContext:
+        if ctx is None:
+            return TickContext(self._time_zone, self._ignore_offset)
+        return ctx
+
+    def get_programmes_from_now_by_end(
+        self, ctx: TickContext | None = None
+    ) -> dict[str, str]:
         ret = {}
-        now = self._time_zone.localize(datetime.now())
+        now = self._context(ctx).now
         for programme in self._programmes:
             if programme._stop >= now:
                 ret[programme.start_hour] = (
@@ -98,23 +248,19 @@ class Channel:
                 )
         return ret
 
-    def get_programmes_for_today(self) -> dict[str, str]:
+    def get_programmes_for_today(
+        self, ctx: TickContext | None = None
+    ) -> dict[str, str]:
         ret = {}
         ret["today"] = {}
 
-        now = self._time_zone.localize(datetime.now())
-        utc_offset = now.utcoffset().total_seconds() / 60 / 60
-        if self._ignore_offset:
-            utc_offset = 0
-        _LOGGER.debug(f"now without utc_offset: {now}")
-        _LOGGER.debug(f"utc_offset: {utc_offset}")
-        now = now + timedelta(hours=utc_offset)
-
-        _LOGGER.debug(f"now with utc_offset: {now}")
+        ctx = self._context(ctx)
+        now = ctx.shifted_now
+        today = now.date()
         for programme in self._programmes:
             # add timezone offset to fix issue with start date is wrong day
-            _start_date = (programme._start + timedelta(hours=utc_offset)).date()
-            if programme._start >= now and _start_date == now.date():
+            _start_date = (programme._start + ctx.offset).date()
+            if programme._start >= now and _start_date == today:
                 obj = {}
                 obj["title"] = programme.title
                 obj["desc"] = programme.desc
@@ -125,23 +271,19 @@ class Channel:
                 ret["today"][programme.start_hour] = obj
         return ret
 
-    def get_programmes_per_day(self) -> dict[str, str]:
+    def get_programmes_per_day(self, ctx: TickContext | None = None) -> dict[str, str]:
         ret = {}
         ret["today"] = {}
         ret["tomorrow"] = {}
-        now = self._time_zone.localize(datetime.now())
-        utc_offset = now.utcoffset().total_seconds() / 60 / 60
-        if self._ignore_offset:
-            utc_offset = 0
-        _LOGGER.debug(f"utc_offset: {utc_offset}")
-        _LOGGER.debug(f"now: {now}")
+        ctx = self._context(ctx)
+        now = ctx.now
 
         for programme in self._programmes:
             if programme._stop >= now:
                 _start_date = (
-                    programme._start + timedelta(hours=utc_offset)
+                    programme._start + ctx.offset
                 ).date()  # add timezone offset to fix issue with time zone for
-                if _start_date == datetime.today().date():
+                if _start_date == ctx.today:
                     obj = {}
                     obj["title"] = programme.title
                     obj["desc"] = programme.desc
@@ -161,15 +303,8 @@ class Channel:
 
         return ret
 
-    def get_current_programme(self) -> Programme:
-        now = self._time_zone.localize(datetime.now())
-        utc_offset = now.utcoffset().total_seconds() / 60 / 60
-        if self._ignore_offset:
-            utc_offset = 0
-        _LOGGER.debug(f"now without utc_offset: {now}")
-        now = now + timedelta(hours=utc_offset)
-        _LOGGER.debug(f"utc_offset: {utc_offset}")
-        _LOGGER.debug(f"now with utc_offset: {now}")
+    def get_current_programme(self, ctx: TickContext | None = None) -> Programme:
+        now = self._context(ctx).shifted_now
         return next(
             (
                 programme
@@ -179,8 +314,8 @@ class Channel:
             None,
         )
 
-    def get_next_programme(self) -> Programme:
-        current = self.get_current_programme()
+    def get_next_programme(self, ctx: TickContext | None = None) -> Programme:
+        current = self.get_current_programme(ctx)
         if current is None:
             return None
         return next(
@@ -192,80 +327,360 @@ class Channel:
             None,
         )
 
-    def get_current_title(self) -> str:
-        p = self.get_current_programme()
+    def get_upcoming_programme(self, ctx: TickContext | None = None) -> Programme:
+        """Return the first programme that has not started yet."""
+        now = self._context(ctx).shifted_now
+        if self._starts is None:
+            self._starts = [programme._start for programme in self._programmes]
+        index = bisect_right(self._starts, now)
+        return self._programmes[index] if index < len(self._programmes) else None
+
+    def get_programme_starting_from(self, start) -> Programme:
+        """Return the first programme starting at or after start."""
+        if self._starts is None:
+            self._starts = [programme._start for programme in self._programmes]
+        index = bisect_left(self._starts, start)
+        return self._programmes[index] if index < len(self._programmes) else None
+
+    def get_current_title(self, ctx: TickContext | None = None) -> str:
+        p = self.get_current_programme(ctx)
         if p is None:
             return "Currently Unavailable"
         return p.title
 
-    def get_current_desc(self) -> str:
-        p = self.get_current_programme()
+    def get_current_desc(self, ctx: TickContext | None = None) -> str:
+        p = self.get_current_programme(ctx)
         if p is None:
             return "Currently Unavailable"
         return p.desc
 
-    def get_current_subtitle(self) -> str:
-        p = self.get_current_programme()
+    def get_current_subtitle(self, ctx: TickContext | None = None) -> str:
+        p = self.get_current_programme(ctx)
         if p is None:
             return "Currently Unavailable"
         return p.sub_title
 
 
+class NowNextGrid:
+    """What is on now and next on every channel of a guide.
+
+    A row is only recomputed when its channel changed or its programme
+    boundary passed, so a tick between boundaries costs nothing.
+    """
+
+    def __init__(self) -> None:
+        """Initialize an empty grid."""
+        self._rows = {}
+        self._boundaries = {}
+        self._expires = None
+        self.rows = []
+        self.version = 0
+
+    def update(self, guide: Guide, ctx: TickContext, changed=None) -> bool:
+        """Refresh stale rows; changed None means every channel changed."""
+        now = ctx.shifted_now
+        if changed is None:
+            stale = {channel.id for channel in guide.channels()} | set(self._rows)
+        else:
+            stale = set(changed)
+        if self._expires is not None and now >= self._expires:
+            stale.update(
+                channel_id
+                for channel_id, boundary in self._boundaries.items()
+                if boundary is not None and boundary <= now
+            )
+        if not stale:
+            return False
+
+        for channel_id in stale:
+            channel = guide.get_channel_by_id(channel_id)
+            if channel is None:
+                self._rows.pop(channel_id, None)
+                self._boundaries.pop(channel_id, None)
+                continue
+            self._rows[channel_id], self._boundaries[channel_id] = self._row(
+                channel, ctx
+            )
+        self.rows = sorted(self._rows.values(), key=lambda row: row["channel_name"])
+        self._expires = min(
+            (boundary for boundary in self._boundaries.values() if boundary),
+            default=None,
+        )
+        self.version += 1
+        return True
+
+    @staticmethod
+    def _row(channel: Channel, ctx: TickContext):
+        """Return the grid row of a channel and when it goes stale."""
+        current = channel.get_current_programme(ctx)
+        if current is not None:
+            # Not get_next_programme: that misses a next one after a gap
+            upcoming = channel.get_programme_starting_from(current._stop)
+            boundary = current._stop
+        else:
+            upcoming = channel.get_upcoming_programme(ctx)
+            boundary = upcoming._start if upcoming else None
+        row = {
+            "channel_id": channel.id,
+            "channel_name": channel.name(),
+            "channel_icon": channel.icon(),
+            "current": _grid_programme(current, channel._time_zone),
+            "next": _grid_programme(upcoming, channel._time_zone),
+            "ends_at": (
+                current._stop.astimezone(channel._time_zone).isoformat()
+                if current
+                else None
+            ),
+        }
+        return row, boundary
+
+
+def _grid_programme(programme: Programme | None, time_zone):
+    if programme is None:
+        return None
+    return {
+        "title": programme.title,
+        "sub_title": programme.sub_title,
+        "start": programme._start.astimezone(time_zone).isoformat(),
+        "end": programme._stop.astimezone(time_zone).isoformat(),
+    }
+
+
 class Guide:
     TIMEZONE = None
 
-    def __init__(self, text, selected_channels, time_zone, ignore_offset=False) -> None:
-        """Initialize the class"""
+    def __init__(
+        self, source, selected_channels, time_zone, ignore_offset=False
+    ) -> None:
+        """Initialize the class.
+
+        source is XMLTV as str, bytes, bytearray or a binary file-like object
+        (such as a memory map); it is parsed in a single streaming pass. Pass
+        None to create an empty guide.
+        """
         self._channels = []
+        self._channels_by_id = {}
         self.TIMEZONE = time_zone
-        soup = BeautifulSoup(text, "xml")
-        _LOGGER.debug(f"TIMEZONE: {time_zone}")
-
-        for channel in soup.find_all("channel"):
-            display_name = next(channel.children)
-            lang = None
-            icon = "https://images.open-epg.com/1700.png"
-            if selected_channels == "ALL" or display_name.text in selected_channels:
-                children = channel.findChildren()
-                for child in children:
-                    if child.name == "display-name":
-                        display_name = child.text[:-3]
-                        lang = child.get("lang")
-                        continue
-                    if child.name == "icon":
-                        icon = child.get("src")
-                        continue
-                _channel = Channel(
-                    channel["id"], display_name, icon, lang, time_zone, ignore_offset
-                )
-                _LOGGER.debug("setting channel %s", display_name)
-                for prog in soup.find_all("programme", {"channel": channel["id"]}):
-                    children = prog.findChildren()
-                    title = "Not Available"
-                    desc = ""
-                    sub_title = ""
-                    for child in children:
-                        if child.name == "title":
-                            title = child.text
-                            continue
-                        if child.name == "desc":
-                            desc = child.text
-                            continue
-                        if child.name.lower() == "sub-title":
-                            sub_title = child.text
-                            continue
-                    _prog = Programme(
-                        prog["start"], prog["stop"], title, sub_title, desc, time_zone
+        self._ignore_offset = ignore_offset
+        _LOGGER.debug("TIMEZONE: %s", time_zone)
+        if source is not None:
+            self._parse(source, selected_channels)
+
+    def _parse(self, source, selected_channels) -> None:
+        """Build channels and programmes while streaming through the XML."""
+        if isinstance(source, str):
+            source = source.encode()
+        if isinstance(source, bytearray):
+            # BytesIO would copy the whole buffer; read it through a view
+            source = _BufferReader(source)
+        elif isinstance(source, bytes):
+            source = BytesIO(source)
+        time_zone = self.TIMEZONE
+        # Reruns and simulcast channels repeat the same text and programmes,
+        # so each distinct description and programme is kept only once
+        descriptions = {}
+        programmes = {}
+        for _, element in etree.iterparse(
+            source, events=("end",), tag=("channel", "programme"), huge_tree=True
+        ):
+            if element.tag == "channel":
+                self._parse_channel(element, selected_channels)
+            else:
+                _channel = self._channels_by_id.get(element.get("channel"))
+                if _channel is not None:
+                    _channel.add_programme(
+                        _parse_programme(
+                            element, time_zone, descriptions, programmes
+                        )
                     )
-                    _channel.add_programme(_prog)
-                self.add_cahnnel(_channel)
+            # Drop what was handled so memory stays flat on large guides
+            element.clear()
+            while element.getprevious() is not None:
+                del element.getparent()[0]
+        for _channel in self._channels:
+            _channel.sort_programmes()
+
+    def _parse_channel(self, element, selected_channels) -> None:
+        display_name = element[0].text if len(element) else None
+        lang = None
+        icon = "https://images.open-epg.com/1700.png"
+        if selected_channels == "ALL" or display_name in selected_channels:
+            for child in element.iter("display-name", "icon"):
+                if child.tag == "display-name":
+                    display_name = (child.text or "")[:-3]
+                    lang = child.get("lang")
+                    continue
+                icon = child.get("src")
+            _channel = Channel(
+                element.get("id"),
+                display_name,
+                icon,
+                lang,
+                self.TIMEZONE,
+                self._ignore_offset,
+            )
+            _LOGGER.debug("setting channel %s", display_name)
+            self.add_cahnnel(_channel)
 
     def add_cahnnel(self, channel) -> None:
         """Initialize the sensor."""
         self._channels.append(channel)
+        self._channels_by_id[channel.id] = channel
+
+    def merge(self, other: Guide) -> None:
+        """Merge a lower priority guide into this one.
+
+        Channels only found in other are added; for channels both guides
+        carry, programmes from other only fill the gaps in this guide.
+        """
+        for channel in other.channels():
+            own = self._channels_by_id.get(channel.id)
+            if own is None:
+                own = Channel(
+                    channel.id,
+                    channel.name(),
+                    channel.icon(),
+                    channel._lang,
+                    self.TIMEZONE,
+                    self._ignore_offset,
+                )
+                self.add_cahnnel(own)
+            own.merge_programmes(channel._programmes)
+
+    def diff(self, other: Guide) -> GuideDelta:
+        """Work out what it takes to bring this guide in line with other.
+
+        Only reads both guides, so it can run in the executor while the
+        event loop keeps serving this one; apply the result with apply().
+        """
+        delta = GuideDelta()
+        for channel in other.channels():
+            own = self._channels_by_id.get(channel.id)
+            if own is None:
+                delta.added.append(channel)
+                continue
+            if (own._name, own._icon) != (channel._name, channel._icon):
+                delta.metadata[channel.id] = channel
+            programmes = own.diff_programmes(channel._programmes)
+            if programmes is not None:
+                delta.programmes[channel.id] = programmes
+        delta.removed = [
+            channel.id
+            for channel in self._channels
+            if other.get_channel_by_id(channel.id) is None
+        ]
+        return delta
+
+    def apply(self, delta: GuideDelta) -> set[str]:
+        """Apply a diff; returns the ids of the channels that changed."""
+        for channel in delta.added:
+            self.add_cahnnel(channel)
+        for channel_id, channel in delta.metadata.items():
+            self._channels_by_id[channel_id].update_metadata(channel)
+        for channel_id, programmes in delta.programmes.items():
+            self._channels_by_id[channel_id].set_programmes(programmes)
+        if delta.removed:
+            removed = set(delta.removed)
+            self._channels = [
+                channel for channel in self._channels if channel.id not in removed
+            ]
+            for channel_id in removed:
+                del self._channels_by_id[channel_id]
+        return delta.changed()
+
+    def update(self, other: Guide) -> set[str]:
+        """Bring this guide in line with other, touching only what differs.
+
+        Returns the ids of the channels that were added, removed or changed.
+        """
+        return self.apply(self.diff(other))
+
+    @classmethod
+    def merged(cls, guides: list[Guide]) -> Guide:
+        """Return a new guide combining guides, highest priority first."""
+        guide = cls(None, "ALL", guides[0].TIMEZONE, guides[0]._ignore_offset)
+        for other in guides:
+            guide.merge(other)
+        return guide
 
     def get_channel_by_id(self, id) -> Channel:
-        return next((channel for channel in self._channels if channel.id == id), None)
+        return self._channels_by_id.get(id)
 
     def channels(self):
         return self._channels
+
+    def tick_context(self) -> TickContext:
+        """Return the evaluation context for the current instant."""
+        return TickContext(self.TIMEZONE, self._ignore_offset)
+
+    def programme_count(self) -> int:
+        return sum(channel.programme_count() for channel in self._channels)
+
+
+class _BufferReader:
+    """A read-only file over a buffer, handing out one chunk at a time."""
+
+    def __init__(self, buffer) -> None:
+        """Initialize the reader at the start of buffer."""
+        self._view = memoryview(buffer)
+        self._position = 0
+
+    def read(self, size: int = -1) -> bytes:
+        """Return up to size bytes, or the rest if size is negative."""
+        start = self._position
+        end = len(self._view) if size < 0 else min(start + size, len(self._view))
+        self._position = end
+        return self._view[start:end].tobytes()
+
+
+class GuideDelta:
+    """The channel changes that bring one guide in line with another."""
+
+    def __init__(self) -> None:
+        """Initialize an empty delta."""
+        self.added: list[Channel] = []
+        self.removed: list[str] = []
+        # Channel id to the new name and icon, or the new schedule
+        self.metadata: dict[str, Channel] = {}
+        self.programmes: dict[str, list[Programme]] = {}
+
+    def changed(self) -> set[str]:
+        """Return the ids of every channel the delta touches."""
+        return {
+            *(channel.id for channel in self.added),
+            *self.removed,
+            *self.metadata,
+            *self.programmes,
+        }
+
+
+def _parse_programme(element, time_zone, descriptions, programmes) -> Programme:
+    """Return the programme of an element, shared with identical ones."""
+    title = "Not Available"
+    desc = ""
+    sub_title = ""
+    for child in element:
+        tag = child.tag
+        if tag == "title":
+            title = child.text or ""
+            continue
+        if tag == "desc":
+            desc = child.text or ""
+            continue
+        if isinstance(tag, str) and tag.lower() == "sub-title":
+            sub_title = child.text or ""
+            continue
+    start = element.get("start")
+    stop = element.get("stop")
+    key = (start, stop, title, sub_title, desc)
+    programme = programmes.get(key)
+    if programme is None:
+        programme = programmes[key] = Programme(
+            start,
+            stop,
+            sys.intern(title),
+            sys.intern(sub_title),
+            descriptions.setdefault(desc, desc),
+            time_zone,
+        )
+    return programme
@@ -2,38 +2,200 @@
 
 from __future__ import annotations
 
+import asyncio
 import datetime
 import logging
+import mmap
 import os
 import re
-from pathlib import Path
+import time
+from contextlib import suppress
+from email.utils import formatdate
+from uuid import uuid4
 from typing import Final
 
-import aiohttp
 import pytz
+import voluptuous as vol
 
-from homeassistant.components.sensor import SensorEntity
+from homeassistant.components.sensor import SensorEntity, SensorStateClass
 from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import EntityCategory, UnitOfInformation, UnitOfTime
 from homeassistant.core import (
+    CALLBACK_TYPE,
     HomeAssistant,
     ServiceCall,
     ServiceResponse,
     SupportsResponse,
+    callback,
 )
 from homeassistant.exceptions import HomeAssistantError
+import homeassistant.helpers.config_validation as cv
+from homeassistant.helpers import entity_registry as er
 from homeassistant.helpers.aiohttp_client import async_get_clientsession
+from homeassistant.helpers.event import async_track_time_interval
 from homeassistant.helpers.update_coordinator import (
     CoordinatorEntity,
     DataUpdateCoordinator,
     UpdateFailed,
 )
 
-from .const import DOMAIN, ICON
-from .guide_classes import Guide
+from .const import (
+    CACHE_MAX_AGE,
+    DOMAIN,
+    FETCH_FAILURE_COOLDOWN,
+    ICON,
+    LIVE_OPTIONS,
+    LOCAL_SOURCE_POLL_INTERVAL,
+    MIN_PROGRAMME_RATIO,
+)
+from .fetcher import (
+    GuideFetchError,
+    async_fetch_guide,
+    cache_file_name,
+    is_custom_source,
+    is_url,
+    local_path,
+)
+from .guide_classes import Guide, NowNextGrid, TickContext
+from .watchlist import Watchlist
 from datetime import timedelta
 
 _LOGGER: Final = logging.getLogger(__name__)
 
+# Downloaded guides are cached here, never beside a user's local guide file
+CACHE_DIR: Final = os.path.join(os.path.dirname(__file__), "userfiles")
+
+
+class CoordinatorStats:
+    """Timings and counters recorded by the coordinator for diagnostics."""
+
+    def __init__(self) -> None:
+        """Initialize all counters to zero."""
+        self.downloads = 0
+        self.download_bytes = 0
+        self.download_seconds = 0.0
+        self.parses = 0
+        self.parse_seconds = 0.0
+        self.channels_parsed = 0
+        self.programmes_parsed = 0
+        self.file_cache_hits = 0
+        self.snapshot_cache_hits = 0
+        self.http_not_modified = 0
+        self.download_retries = 0
+        self.download_failures = 0
+        self.channels_changed = 0
+        self.attribute_builds = 0
+        self.attribute_build_seconds = 0.0
+        self._tick_attribute_build_seconds = 0.0
+
+    def record_download(self, num_bytes: int, seconds: float) -> None:
+        """Record a completed guide download."""
+        self.downloads += 1
+        self.download_bytes = num_bytes
+        self.download_seconds = seconds
+
+    def record_parse(self, seconds: float) -> None:
+        """Record a completed parse of one source."""
+        self.parses += 1
+        self.parse_seconds = seconds
+
+    def record_guide(self, guide: Guide) -> None:
+        """Record the size of the guide served to the sensors."""
+        self.channels_parsed = len(guide.channels())
+        self.programmes_parsed = guide.programme_count()
+
+    def record_attribute_build(self, seconds: float) -> None:
+        """Accumulate the time spent building sensor attributes in this tick."""
+        self.attribute_builds += 1
+        self._tick_attribute_build_seconds += seconds
+
+    def start_tick(self) -> None:
+        """Close the previous tick's attribute timing and start a new one."""
+        self.attribute_build_seconds = self._tick_attribute_build_seconds
+        self._tick_attribute_build_seconds = 0.0
+
+    def as_dict(self) -> dict:
+        """Return the public counters as a dictionary."""
+        return {
+            key: value for key, value in vars(self).items() if not key.startswith("_")
+        }
+
+
+class GuideSource:
+    """One XMLTV file feeding a config entry, with its download state.
+
+    A source without url is a local file that is re-read when it changes.
+    """
+
+    def __init__(
+        self, name: str, url: str | None, file_path: str, selected_channels
+    ) -> None:
+        """Initialize the source."""
+        self.name = name
+        self.url = url
+        self.file_path = file_path
+        self.selected_channels = selected_channels
+        self.guide: Guide | None = None
+        self.mtime: float | None = None
+        # Epoch time after which the cached file must be downloaded again
+        self.expires_at: float | None = None
+        # Set by the watcher when a local file changed on disk
+        self.dirty = True
+        self.download_succeeded = False
+        self.last_download_programmes = 0
+        self.retry_download_at: datetime.datetime | None = None
+
+    @property
+    def local(self) -> bool:
+        """Return True if the source is read straight from a local file."""
+        return self.url is None
+
+
+def _make_source(name: str, cache_dir: str, selected_channels) -> GuideSource:
+    """Create an additional source from an open-epg name, URL or path."""
+    path = local_path(name)
+    if path is not None:
+        return GuideSource(name, None, path, selected_channels)
+    if is_url(name):
+        return GuideSource(
+            name, name, os.path.join(cache_dir, cache_file_name(name)), selected_channels
+        )
+    clean_name = "".join(name.split()).lower()
+    return GuideSource(
+        name,
+        f"https://www.open-epg.com/files/{clean_name}.xml",
+        os.path.join(cache_dir, f"{clean_name}.xml"),
+        selected_channels,
+    )
+
+
+def get_sources(config: dict) -> list[GuideSource]:
+    """Return the sources of a config entry, highest priority first."""
+    file_name = config.get("file_name")
+    file_path = config.get("file_path")
+    generated = config.get("generated", False)
+    selected_channels = (
+        "ALL"
+        if generated or is_custom_source(file_name)
+        else config.get("selected_channels", [])
+    )
+    if generated:
+        primary = GuideSource(
+            file_name,
+            f"https://www.open-epg.com/generate/{file_name}.xml",
+            file_path,
+            selected_channels,
+        )
+    else:
+        primary = _make_source(file_name, CACHE_DIR, selected_channels)
+        # Keep the cache file chosen by the config flow
+        primary.file_path = file_path
+    sources = [primary]
+
+    for name in config.get("additional_sources", []):
+        sources.append(_make_source(name, CACHE_DIR, selected_channels))
+    return sources
+
 
 class EpgDataUpdateCoordinator(DataUpdateCoordinator[Guide | None]):
     """Class to manage fetching EPG data."""
@@ -44,6 +206,20 @@ class EpgDataUpdateCoordinator(DataUpdateCoordinator[Guide | None]):
         self.config_options = config  # Store options from config entry
         self.hass = hass
         self._guide: Guide | None = None
+        self._merged_from: list[Guide] = []
+        # Set by the sensor platform so channel sensors can be added live
+        self.async_add_entities = None
+        self.channel_sensors: dict[str, ChannelSensor] = {}
+        # Channel ids changed by the last refresh; None means all of them
+        self.changed_channels: set[str] | None = None
+        self._sources = get_sources(config)
+        self.stats = CoordinatorStats()
+        self.tick: TickContext | None = None
+        self.now_next = NowNextGrid()
+        self.watchlist = Watchlist(hass, config_entry.entry_id)
+        self._force_download = False
+        self.download_succeeded = False
+        self._time_zone = None
 
         # Define the update interval
         update_interval = timedelta(minutes=1)
@@ -54,57 +230,194 @@ class EpgDataUpdateCoordinator(DataUpdateCoordinator[Guide | None]):
             update_interval=update_interval,
         )
 
-    def need_to_update(self, file_path: str) -> bool:
-        """Check if the file needs to be updated."""
-        if not Path(file_path).exists():
+    async def async_apply_options(self, options) -> bool:
+        """Apply changed options without reloading the entry.
+
+        Returns False if a changed option needs a full reload. Removing a
+        channel, or adding back one the guide in memory still holds, is
+        instant. Sources are parsed with the channel filter to save memory,
+        so adding any other channel re-parses the cached guide files with the
+        new filter; this costs a parse, but no download.
+        """
+        changed = {
+            key
+            for key in {*self.config_options, *options}
+            if self.config_options.get(key) != options.get(key)
+        }
+        if not changed:
             return True
-        file_mod_time = datetime.datetime.fromtimestamp(os.path.getmtime(file_path))
-        return (datetime.datetime.now() - file_mod_time) > timedelta(hours=24)
+        if not changed <= LIVE_OPTIONS:
+            return False
+        self.config_options = options
+        if "selected_channels" in changed:
+            channel_ids = get_exposed_channel_ids(self._guide, options) or []
+            missing = self._guide is None or any(
+                self._guide.get_channel_by_id(channel_id) is None
+                for channel_id in channel_ids
+            )
+            for source, updated in zip(self._sources, get_sources(options)):
+                source.selected_channels = updated.selected_channels
+                if missing:
+                    source.guide = None
+                    source.dirty = True
+            if missing:
+                # Not in memory: re-parse the cached files, which is as slow
+                # as a cold start but does not download anything
+                await self.async_refresh()
+            await async_sync_channel_sensors(self)
+        # Options such as full_schedule change every sensor's attributes
+        self.changed_channels = None
+        self._update_now_next(self.data)
+        self.watchlist.async_update(self.data, self.tick, None)
+        self.async_update_listeners()
+        return True
+
+    async def async_force_download(self) -> bool:
+        """Download the guide now, bypassing the cache; return success."""
+        self._force_download = True
+        try:
+            await self.async_refresh()
+        finally:
+            self._force_download = False
+        return self.download_succeeded
 
     async def _async_update_data(self) -> Guide | None:
-        """Fetch data from API endpoint.
-
-        if not self.need_to_update(file_path):
-        """
+        """Load the guide and fix the instant all sensors evaluate against."""
         _LOGGER.debug("Coordinator: Starting data update")
-        file_name = self.config_options.get("file_name")
-        generated = self.config_options.get("generated", False)
-        selected_channels = (
-            "ALL" if generated else self.config_options.get("selected_channels", [])
-        )
-        file_path = self.config_options.get("file_path")
+        self.stats.start_tick()
+        guide = await self._async_load_guide()
+        self.tick = guide.tick_context() if guide else None
+        self._update_now_next(guide)
+        self.watchlist.async_update(guide, self.tick, self.changed_channels)
+        return guide
+
+    def _update_now_next(self, guide: Guide | None) -> None:
+        """Bring the now/next grid up to date with the current tick."""
+        if guide is None or self.tick is None:
+            if self.now_next.rows:
+                self.now_next = NowNextGrid()
+            return
+        self.now_next.update(guide, self.tick, self.changed_channels)
+
+    async def _async_load_guide(self) -> Guide | None:
+        """Load every source concurrently and merge them by priority."""
         ignore_offset = self.config_options.get("ignore_timezone_offset")
-        time_zone = await self.hass.async_add_executor_job(
-            pytz.timezone, self.hass.config.time_zone
+        if self._time_zone is None:
+            # pytz reads its database from disk, so look it up only once
+            self._time_zone = await self.hass.async_add_executor_job(
+                pytz.timezone, self.hass.config.time_zone
+            )
+            _LOGGER.debug("time_zone is: %s", self._time_zone)
+        time_zone = self._time_zone
+        results = await asyncio.gather(
+            *(
+                self._async_load_source(source, time_zone, ignore_offset)
+                for source in self._sources
+            ),
+            return_exceptions=True,
+        )
+        guides = []
+        error = None
+        for source, result in zip(self._sources, results):
+            if isinstance(result, Exception):
+                error = result
+                _LOGGER.error("Coordinator: Failed to load %s: %s", source.name, result)
+                # Keep the source's channels in the merge until it recovers
+                result = self._keep_snapshot(source)
+            if result is not None:
+                guides.append(result)
+        self.download_succeeded = all(
+            source.download_succeeded for source in self._sources
         )
-        _LOGGER.debug("time_zone is: %s", time_zone)
-        if not self.need_to_update(file_path):
+        if not guides:
+            if error is not None:
+                # Raise UpdateFailed for unexpected errors
+                raise UpdateFailed(f"Unexpected error during update: {error}")
+            return None
+
+        if self._guide is not None and len(guides) == len(self._merged_from) and all(
+            new is old for new, old in zip(guides, self._merged_from)
+        ):
+            # No source produced a new guide since the last merge
+            self.changed_channels = set()
+            return self._guide
+
+        # Merging and diffing walk every programme, so keep them off the loop
+        merged, delta = await self.hass.async_add_executor_job(
+            _merge_and_diff, self._guide, guides
+        )
+        self._merged_from = guides
+        if delta is None:
+            self.changed_channels = None
+            self._guide = merged
+        else:
+            # Only applying the differences runs on the event loop, where
+            # sensors read the guide, so its cost follows the size of the change
+            self.changed_channels = self._guide.apply(delta)
+            self.stats.channels_changed = len(self.changed_channels)
+            _LOGGER.debug(
+                "Coordinator: %s channels changed", len(self.changed_channels)
+            )
+        self.stats.record_guide(self._guide)
+        return self._guide
+
+    async def _async_load_source(
+        self, source: GuideSource, time_zone, ignore_offset
+    ) -> Guide | None:
+        """Return the guide of a remote source, downloading it when due.
+
+        While the parsed guide in memory is younger than the cache lifetime
+        the disk is not touched at all; otherwise all file work of the tick
+        runs in a single executor job.
+        """
+        if source.local:
+            return await self._async_load_local_source(
+                source, time_zone, ignore_offset
+            )
+        file_name = source.name
+        file_path = source.file_path
+        selected_channels = source.selected_channels
+        source.download_succeeded = False
+        if (
+            not self._force_download
+            and source.guide is not None
+            and source.expires_at is not None
+            and time.time() < source.expires_at
+        ):
+            self.stats.snapshot_cache_hits += 1
+            return source.guide
+        if (
+            source.guide is not None
+            and not self._force_download
+            and source.retry_download_at
+            and datetime.datetime.now() < source.retry_download_at
+        ):
+            # A recent download failed; keep serving the snapshot for a while
+            return self._keep_snapshot(source)
+
+        mtime = None
+        if not self._force_download:
             try:
-                # Read file content asynchronously using executor job
-                local_data = await self.hass.async_add_executor_job(
-                    read_file, file_path
+                started = time.perf_counter()
+                # Serve a stale cache on startup; the download follows next tick
+                mtime, guide = await self.hass.async_add_executor_job(
+                    load_cache,
+                    file_path,
+                    selected_channels,
+                    time_zone,
+                    ignore_offset,
+                    source.guide is None,
                 )
-                if not local_data:
-                    _LOGGER.warning(
-                        "Local file '%s' exists but is empty or could not be read.",
-                        file_path,
-                    )
-
-                else:
-                    guide = await self.hass.async_add_executor_job(
-                        Guide, local_data, selected_channels, time_zone, ignore_offset
-                    )
+                if mtime is not None:
+                    source.expires_at = mtime + CACHE_MAX_AGE.total_seconds()
+                if guide is not None:
+                    self.stats.record_parse(time.perf_counter() - started)
+                    self.stats.file_cache_hits += 1
                     _LOGGER.info(
                         "Successfully loaded EPG guide from local file: %s", file_path
                     )
-                    self._guide = guide  # Update internal state
+                    source.guide = guide  # Update internal state
                     return guide  # Return the guide loaded from the file
-
-            except FileNotFoundError:
-                _LOGGER.warning(
-                    "Local file '%s' not found unexpectedly. Will attempt network fetch.",
-                    file_path,
-                )
             except Exception as err:
                 _LOGGER.error(
                     "Failed to read or parse local EPG file '%s': %s. "
@@ -112,57 +425,174 @@ class EpgDataUpdateCoordinator(DataUpdateCoordinator[Guide | None]):
                     file_path,
                     err,
                 )
-        if generated:
-            guide_url = f"https://www.open-epg.com/generate/{file_name}.xml"
-            selected_channels_param = "ALL"  # Guide class handles "ALL"
-        else:
-            # Ensure filename is clean for URL
-            clean_file_name = "".join(file_name.split()).lower()
-            guide_url = f"https://www.open-epg.com/files/{clean_file_name}.xml"
-            selected_channels_param = selected_channels
+        guide_url = source.url
 
         session = async_get_clientsession(self.hass)
 
         guide = None
 
+        # Let the server answer 304 if the stale cache is still current
+        if_modified_since = (
+            formatdate(mtime, usegmt=True) if mtime and source.guide else None
+        )
+
         try:
             _LOGGER.debug("Coordinator: Fetching guide from %s", guide_url)
-            response = await session.get(guide_url)
-            response.raise_for_status()
-            data = await response.text()
-
-            if data and "channel" in data:
-                _LOGGER.debug(
-                    f"Coordinator: Successfully fetched guide data for {file_name}"
-                )
+            result = await async_fetch_guide(
+                session,
+                guide_url,
+                if_modified_since,
+                min_programmes=max(
+                    1, int(source.last_download_programmes * MIN_PROGRAMME_RATIO)
+                ),
+            )
+            self.stats.download_retries += result.attempts - 1
+            source.retry_download_at = None
+            if result.not_modified:
+                _LOGGER.debug("Coordinator: Guide at %s not modified", guide_url)
+                self.stats.http_not_modified += 1
+                # The guide in memory was parsed from this very file
+                await self.hass.async_add_executor_job(os.utime, file_path)
+                source.expires_at = time.time() + CACHE_MAX_AGE.total_seconds()
+                source.download_succeeded = True
+                return source.guide
+            # Keep the raw bytes: the parser decodes them itself
+            data = result.data
+            self.stats.record_download(len(data), result.seconds)
+            source.last_download_programmes = result.programmes
+
+            _LOGGER.debug(
+                "Coordinator: Successfully fetched guide data for %s", file_name
+            )
 
-                os.makedirs(os.path.dirname(file_path), exist_ok=True)
-                # Write the fetched data to the file asynchronously
-                await self.hass.async_add_executor_job(write_file, file_path, data)
+            # Write the new generation beside the current cache file
+            tmp_path = await self.hass.async_add_executor_job(
+                write_file, file_path, data
+            )
+            try:
                 # Parse the guide data
-                guide = await self.hass.async_add_executor_job(
-                    Guide, data, selected_channels_param, time_zone, ignore_offset
+                guide = await self._async_parse(
+                    Guide, data, selected_channels, time_zone, ignore_offset
                 )
-                _LOGGER.debug(
-                    f"Coordinator: Guide parsed with {len(guide.channels()) if guide else 0} channels."
+            except Exception as err:
+                await self.hass.async_add_executor_job(discard_file, tmp_path)
+                # A body can pass validation and still be malformed XML; back
+                # off like a failed download instead of fetching it every tick
+                self.stats.download_failures += 1
+                source.retry_download_at = (
+                    datetime.datetime.now() + FETCH_FAILURE_COOLDOWN
                 )
-                self._guide = guide  # Store the latest guide
-                return guide
-            else:
                 _LOGGER.error(
-                    f"Coordinator: No valid 'channel' data received from {guide_url}. Response snippet: {data[:200]}"
+                    "Coordinator: Failed to parse guide from %s: %s", guide_url, err
                 )
-                return self._guide  # Keep old data on error
-
-        except aiohttp.ClientError as err:
-            _LOGGER.error(f"Coordinator: Error fetching guide from {guide_url}: {err}")
-            return self._guide  # Keep old data on transient error
+                return self._keep_snapshot(source)
+            # Only replace the previous generation once the new one parsed
+            await self.hass.async_add_executor_job(
+                commit_file, tmp_path, file_path
+            )
+            _LOGGER.debug(
+                "Coordinator: Guide parsed with %s channels.",
+                len(guide.channels()) if guide else 0,
+            )
+            source.expires_at = time.time() + CACHE_MAX_AGE.total_seconds()
+            source.download_succeeded = True
+            source.guide = guide  # Store the latest guide
+            return guide
+
+        except GuideFetchError as err:
+            self.stats.download_failures += 1
+            source.retry_download_at = (
+                datetime.datetime.now() + FETCH_FAILURE_COOLDOWN
+            )
+            _LOGGER.error("Coordinator: Error fetching guide from %s: %s", guide_url, err)
+            return self._keep_snapshot(source)  # Keep old data on transient error
         except Exception as err:
             _LOGGER.exception(
-                f"Coordinator: Unexpected error during update for {file_name}: {err}"
+                "Coordinator: Unexpected error during update for %s: %s", file_name, err
             )
-            # Raise UpdateFailed for unexpected errors
-            raise UpdateFailed(f"Unexpected error during update: {err}")
+            raise
+
+    async def _async_load_local_source(
+        self, source: GuideSource, time_zone, ignore_offset
+    ) -> Guide | None:
+        """Re-read a local guide file only after the watcher saw it change."""
+        if source.guide is not None and not source.dirty:
+            source.download_succeeded = True
+            self.stats.snapshot_cache_hits += 1
+            return source.guide
+        source.download_succeeded = False
+        try:
+            # Remember the mtime of every attempt, so a broken or half
+            # written file is only parsed again once it changes
+            source.mtime = await self.hass.async_add_executor_job(
+                _get_mtime, source.file_path
+            )
+            source.dirty = False
+            if source.mtime is None:
+                _LOGGER.warning("Local guide file '%s' not found", source.file_path)
+                return self._keep_snapshot(source)
+            started = time.perf_counter()
+            guide = await self.hass.async_add_executor_job(
+                parse_file,
+                source.file_path,
+                source.selected_channels,
+                time_zone,
+                ignore_offset,
+            )
+        except Exception as err:
+            _LOGGER.error(
+                "Failed to parse local EPG file '%s': %s", source.file_path, err
+            )
+            return self._keep_snapshot(source)
+        if guide is None:
+            _LOGGER.warning("Local guide file '%s' is empty", source.file_path)
+            return self._keep_snapshot(source)
+        _LOGGER.debug("Coordinator: Reloaded local guide %s", source.file_path)
+        self.stats.record_parse(time.perf_counter() - started)
+        self.stats.file_cache_hits += 1
+        source.download_succeeded = True
+        source.guide = guide
+        return guide
+
+    @callback
+    def async_watch_local_sources(self) -> CALLBACK_TYPE | None:
+        """Poll local sources and refresh as soon as one of them changes."""
+        local_sources = [source for source in self._sources if source.local]
+        if not local_sources:
+            return None
+        paths = [source.file_path for source in local_sources]
+
+        async def _async_check(_now) -> None:
+            mtimes = await self.hass.async_add_executor_job(_get_mtimes, paths)
+            changed = False
+            for source, mtime in zip(local_sources, mtimes):
+                if mtime is not None and mtime != source.mtime:
+                    source.dirty = True
+                    changed = True
+            if changed:
+                await self.async_request_refresh()
+
+        return async_track_time_interval(
+            self.hass, _async_check, LOCAL_SOURCE_POLL_INTERVAL
+        )
+
+    async def _async_parse(
+        self, parser, source, selected_channels, time_zone, ignore_offset
+    ) -> Guide | None:
+        """Parse guide data in the executor and record how long it took."""
+        started = time.perf_counter()
+        guide = await self.hass.async_add_executor_job(
+            parser, source, selected_channels, time_zone, ignore_offset
+        )
+        if guide is not None:
+            self.stats.record_parse(time.perf_counter() - started)
+        return guide
+
+    def _keep_snapshot(self, source: GuideSource) -> Guide | None:
+        """Return the last parsed guide of a source after a failed fetch."""
+        if source.guide is not None:
+            self.stats.snapshot_cache_hits += 1
+        return source.guide
 
 
 async def async_setup_entry(
@@ -171,6 +601,7 @@ async def async_setup_entry(
     """Set up the EPG sensor platform."""
     await _register_services(hass, config_entry)
     coordinator = await _initialize_coordinator(hass, config_entry)
+    coordinator.async_add_entities = async_add_entities
     entities = await _create_entities(coordinator, config_entry)
     if entities:
         async_add_entities(entities)
@@ -187,6 +618,26 @@ async def _register_services(hass: HomeAssistant, config_entry: ConfigEntry):
         """Handle the service call to search for programs."""
         return await _handle_search_program(hass, call)
 
+    async def handle_get_schedule(call: ServiceCall) -> ServiceResponse:
+        """Handle the service call to page through the schedule."""
+        return await _handle_get_schedule(hass, call)
+
+    async def handle_get_now_next(call: ServiceCall) -> ServiceResponse:
+        """Handle the service call to list what is on now and next."""
+        return await _handle_get_now_next(hass, call)
+
+    async def handle_add_watch(call: ServiceCall) -> ServiceResponse:
+        """Handle the service call to add a programme to the watchlist."""
+        return await _handle_add_watch(hass, call)
+
+    async def handle_remove_watch(call: ServiceCall) -> None:
+        """Handle the service call to remove a programme from the watchlist."""
+        await _handle_remove_watch(hass, call)
+
+    async def handle_get_watchlist(call: ServiceCall) -> ServiceResponse:
+        """Handle the service call to list the watchlist and its matches."""
+        return await _handle_get_watchlist(hass, call)
+
     hass.services.async_register(
         DOMAIN, "handle_update_channels", handle_update_channels
     )
@@ -197,49 +648,128 @@ async def _register_services(hass: HomeAssistant, config_entry: ConfigEntry):
             handle_search_program,
             supports_response=SupportsResponse.ONLY,
         )
+    if not hass.services.has_service(DOMAIN, "get_schedule"):
+        hass.services.async_register(
+            DOMAIN,
+            "get_schedule",
+            handle_get_schedule,
+            schema=GET_SCHEDULE_SCHEMA,
+            supports_response=SupportsResponse.ONLY,
+        )
+    if not hass.services.has_service(DOMAIN, "get_now_next"):
+        hass.services.async_register(
+            DOMAIN,
+            "get_now_next",
+            handle_get_now_next,
+            supports_response=SupportsResponse.ONLY,
+        )
+    if not hass.services.has_service(DOMAIN, "add_watch"):
+        hass.services.async_register(
+            DOMAIN,
+            "add_watch",
+            handle_add_watch,
+            schema=ADD_WATCH_SCHEMA,
+            supports_response=SupportsResponse.OPTIONAL,
+        )
+    if not hass.services.has_service(DOMAIN, "remove_watch"):
+        hass.services.async_register(
+            DOMAIN, "remove_watch", handle_remove_watch, schema=REMOVE_WATCH_SCHEMA
+        )
+    if not hass.services.has_service(DOMAIN, "get_watchlist"):
+        hass.services.async_register(
+            DOMAIN,
+            "get_watchlist",
+            handle_get_watchlist,
+            schema=GET_WATCHLIST_SCHEMA,
+            supports_response=SupportsResponse.ONLY,
+        )
 
 
 async def _initialize_coordinator(hass: HomeAssistant, config_entry: ConfigEntry):
     """Initialize the data update coordinator."""
     coordinator = EpgDataUpdateCoordinator(hass, config_entry, config_entry.options)
+    await coordinator.watchlist.async_load()
+    config_entry.async_on_unload(coordinator.watchlist.async_stop)
     await coordinator.async_config_entry_first_refresh()
+    if unsub := coordinator.async_watch_local_sources():
+        config_entry.async_on_unload(unsub)
     hass.data.setdefault(DOMAIN, {})[config_entry.entry_id] = coordinator
     return coordinator
 
 
+def get_exposed_channel_ids(guide: Guide | None, config_options) -> list[str] | None:
+    """Return the ids of the channels that get a sensor, or None if unknown."""
+    # URL and local file entries track every channel, like generated ones
+    if config_options.get("generated", False) or is_custom_source(
+        config_options.get("file_name", "")
+    ):
+        return [channel.id for channel in guide.channels()] if guide else None
+    return list(config_options.get("selected_channels", []))
+
+
+def get_expected_unique_ids(
+    config_entry: ConfigEntry, guide: Guide | None
+) -> set[str] | None:
+    """Return the unique ids of every entity the entry should have."""
+    channel_ids = get_exposed_channel_ids(guide, config_entry.options)
+    if channel_ids is None:
+        return None
+    entry_id = config_entry.entry_id
+    return (
+        {f"{entry_id}_{channel_id}" for channel_id in channel_ids}
+        | {f"{entry_id}_diagnostic_{key}" for key, *_ in DIAGNOSTIC_SENSORS}
+        | {f"{entry_id}_now_next"}
+    )
+
+
 async def _create_entities(coordinator, config_entry):
     """Create sensor entities based on the coordinator data."""
-    entities = []
-    if coordinator.data:
-        guide: Guide = coordinator.data
-        config_options = config_entry.options
-        file_name = config_options.get("file_name")
-        generated = config_options.get("generated", False)
-
-        if generated:
-            entities.extend(
-                ChannelSensor(
-                    coordinator,
-                    channel.id,
-                    channel.name(),
-                    config_options,
-                )
-                for channel in guide.channels()
+    entities = _create_channel_sensors(coordinator)
+    entities.append(EpgNowNextSensor(coordinator))
+    entities.extend(
+        EpgDiagnosticSensor(coordinator, description)
+        for description in DIAGNOSTIC_SENSORS
+    )
+    return entities
+
+
+def _create_channel_sensors(coordinator, skip=()) -> list[ChannelSensor]:
+    """Create sensors for the exposed channels the guide holds."""
+    sensors = []
+    guide: Guide | None = coordinator.data
+    if not guide:
+        return sensors
+    config_options = coordinator.config_options
+    for channel_id in get_exposed_channel_ids(guide, config_options):
+        channel = guide.get_channel_by_id(channel_id)
+        if channel and channel.id not in skip:
+            sensor = ChannelSensor(
+                coordinator,
+                channel.id,
+                channel.name(),
+                config_options,
             )
+            coordinator.channel_sensors[channel.id] = sensor
+            sensors.append(sensor)
+    return sensors
+
+
+async def async_sync_channel_sensors(coordinator: EpgDataUpdateCoordinator) -> None:
+    """Add and remove channel sensors to match the selected channels."""
+    exposed = set(
+        get_exposed_channel_ids(coordinator.data, coordinator.config_options) or []
+    )
+    registry = er.async_get(coordinator.hass)
+    for channel_id in set(coordinator.channel_sensors) - exposed:
+        sensor = coordinator.channel_sensors.pop(channel_id)
+        _LOGGER.debug("Removing sensor of unselected channel %s", channel_id)
+        if sensor.registry_entry:
+            registry.async_remove(sensor.entity_id)
         else:
-            selected_channels_names = config_options.get("selected_channels", [])
-            for channel_name in selected_channels_names:
-                channel = guide.get_channel_by_id(channel_name)
-                if channel:
-                    entities.append(
-                        ChannelSensor(
-                            coordinator,
-                            channel.id,
-                            channel.name(),
-                            config_options,
-                        )
-                    )
-    return entities
+            await sensor.async_remove()
+    added = _create_channel_sensors(coordinator, skip=coordinator.channel_sensors)
+    if added and coordinator.async_add_entities:
+        coordinator.async_add_entities(added)
 
 
 async def _handle_update_channels(hass: HomeAssistant, config_entry: ConfigEntry, call):
@@ -247,13 +777,8 @@ async def _handle_update_channels(hass: HomeAssistant, config_entry: ConfigEntry
     entry_id_to_refresh = call.data.get("entry_id", config_entry.entry_id)
     coordinator_to_refresh = hass.data[DOMAIN].get(entry_id_to_refresh)
     if coordinator_to_refresh:
-        file_path = coordinator_to_refresh.config_options.get("file_path", [])
-        if Path(file_path).exists():
-            Path(file_path).rename(f"{file_path}.bak")
-        await coordinator_to_refresh.async_request_refresh()
-        if Path(file_path).exists():
+        if await coordinator_to_refresh.async_force_download():
             _LOGGER.debug("update channels successful")
-            Path(f"{file_path}.bak").unlink()
         else:
             _LOGGER.debug("update channels failed")
 
@@ -283,6 +808,195 @@ async def _handle_search_program(
     return {"results": sorted_results}
 
 
+GET_SCHEDULE_SCHEMA: Final = vol.Schema(
+    {
+        vol.Optional("entry_id"): cv.string,
+        vol.Optional("channel_ids"): vol.All(cv.ensure_list, [cv.string]),
+        vol.Optional("start"): cv.datetime,
+        vol.Optional("end"): cv.datetime,
+        vol.Optional("offset", default=0): cv.positive_int,
+        vol.Optional("limit", default=100): vol.All(
+            vol.Coerce(int), vol.Range(min=1, max=1000)
+        ),
+    }
+)
+
+
+async def _handle_get_schedule(
+    hass: HomeAssistant, call: ServiceCall
+) -> ServiceResponse:
+    """Return one page of the programmes airing in a time range."""
+    channel_ids = call.data.get("channel_ids")
+    offset = call.data["offset"]
+    limit = call.data["limit"]
+    programmes = []
+    for coordinator in _get_coordinators_to_search(hass, call.data.get("entry_id")):
+        if not isinstance(coordinator.data, Guide):
+            continue
+        guide: Guide = coordinator.data
+        start, end = _schedule_window(
+            guide, call.data.get("start"), call.data.get("end")
+        )
+        channels = (
+            [guide.get_channel_by_id(channel_id) for channel_id in channel_ids]
+            if channel_ids
+            else guide.channels()
+        )
+        for channel in channels:
+            if channel is None:
+                continue
+            programmes.extend(
+                (programme, channel)
+                for programme in channel.get_programmes_between(start, end)
+            )
+    programmes.sort(key=lambda item: (item[0]._start, item[1].name()))
+    page = programmes[offset : offset + limit]
+    return {
+        "programmes": [
+            _format_schedule_entry(programme, channel) for programme, channel in page
+        ],
+        "total": len(programmes),
+        "offset": offset,
+        "next_offset": offset + limit if offset + limit < len(programmes) else None,
+    }
+
+
+async def _handle_get_now_next(
+    hass: HomeAssistant, call: ServiceCall
+) -> ServiceResponse:
+    """Return what is on now and next on every channel."""
+    coordinators = _get_coordinators_to_search(hass, call.data.get("entry_id"))
+    channels = []
+    for coordinator in coordinators:
+        channels.extend(coordinator.now_next.rows)
+    if len(coordinators) > 1:
+        channels.sort(key=lambda row: row["channel_name"])
+    return {"channels": channels}
+
+
+ADD_WATCH_SCHEMA: Final = vol.Schema(
+    {
+        vol.Optional("entry_id"): cv.string,
+        vol.Required("title"): cv.string,
+        vol.Optional("channel_ids", default=[]): vol.All(cv.ensure_list, [cv.string]),
+        vol.Optional("regex", default=False): cv.boolean,
+    }
+)
+
+REMOVE_WATCH_SCHEMA: Final = vol.Schema(
+    {
+        vol.Optional("entry_id"): cv.string,
+        vol.Required("watch_id"): cv.string,
+    }
+)
+
+GET_WATCHLIST_SCHEMA: Final = vol.Schema(
+    {
+        vol.Optional("entry_id"): cv.string,
+        vol.Optional("limit", default=100): vol.All(
+            vol.Coerce(int), vol.Range(min=1, max=1000)
+        ),
+    }
+)
+
+
+async def _handle_add_watch(hass: HomeAssistant, call: ServiceCall) -> ServiceResponse:
+    """Add a title pattern to the watchlist of the targeted entries."""
+    coordinators = _get_coordinators_to_search(hass, call.data.get("entry_id"))
+    if not coordinators:
+        raise HomeAssistantError("No EPG entry to add the watch to")
+    # One id for every entry, so a single remove_watch call undoes it
+    watch_id = uuid4().hex
+    entry_ids = []
+    for coordinator in coordinators:
+        try:
+            watch = await coordinator.watchlist.async_add(
+                call.data["title"],
+                call.data["channel_ids"],
+                call.data["regex"],
+                watch_id,
+            )
+        except re.error as err:
+            raise HomeAssistantError(
+                f"Invalid title pattern {call.data['title']}: {err}"
+            ) from err
+        entry_ids.append(coordinator.config_entry.entry_id)
+    return {**watch.as_dict(), "entry_ids": entry_ids}
+
+
+async def _handle_remove_watch(hass: HomeAssistant, call: ServiceCall) -> None:
+    """Remove a watch from whichever targeted entry holds it."""
+    watch_id = call.data["watch_id"]
+    removed = False
+    for coordinator in _get_coordinators_to_search(hass, call.data.get("entry_id")):
+        removed |= await coordinator.watchlist.async_remove_watch(watch_id)
+    if not removed:
+        raise HomeAssistantError(f"Unknown watch {watch_id}")
+
+
+async def _handle_get_watchlist(
+    hass: HomeAssistant, call: ServiceCall
+) -> ServiceResponse:
+    """Return the watches and their upcoming matches, soonest first."""
+    watches = []
+    upcoming = []
+    for coordinator in _get_coordinators_to_search(hass, call.data.get("entry_id")):
+        entry_id = coordinator.config_entry.entry_id
+        watchlist = coordinator.watchlist
+        watches.extend(
+            {"entry_id": entry_id, **watch.as_dict()}
+            for watch in watchlist.watches.values()
+        )
+        upcoming.extend((match, entry_id) for match in watchlist.timeline)
+    upcoming.sort(key=lambda item: item[0].starts_at)
+    return {
+        "watches": watches,
+        "upcoming": [
+            {"entry_id": entry_id, **match.as_dict()}
+            for match, entry_id in upcoming[: call.data["limit"]]
+        ],
+    }
+
+
+def _schedule_window(guide: Guide, start, end):
+    """Return an aware [start, end) window, defaulting to the next 24 hours.
+
+    The window is shifted by the utc offset like the sensors' "now", so the
+    first page agrees with their current programme.
+    """
+    time_zone = guide.TIMEZONE
+    ctx = guide.tick_context()
+    if start is None:
+        start = ctx.shifted_now
+    else:
+        if start.tzinfo is None:
+            start = time_zone.localize(start)
+        start += ctx.offset
+    if end is None:
+        end = start + timedelta(days=1)
+    else:
+        if end.tzinfo is None:
+            end = time_zone.localize(end)
+        end += ctx.offset
+    return start, end
+
+
+def _format_schedule_entry(programme, channel) -> dict:
+    """Format a programme for the get_schedule response."""
+    time_zone = channel._time_zone
+    return {
+        "channel_id": channel.id,
+        "channel_name": channel.name(),
+        "title": programme.title,
+        "sub_title": programme.sub_title,
+        "description": programme.desc,
+        "start": programme._start.astimezone(time_zone).isoformat(),
+        "end": programme._stop.astimezone(time_zone).isoformat(),
+        "start_time": programme.start_hour,
+        "end_time": programme.end_hour,
+    }
+
+
 def _get_coordinators_to_search(hass: HomeAssistant, target_entry_id: str):
     """Get the list of coordinators to search."""
     all_coordinators = hass.data.get(DOMAIN, {})
@@ -301,59 +1015,130 @@ def _search_guide(
 ):
     """Search the guide for matching programs."""
     search_results = []
+    ctx = guide.tick_context()
     for channel in guide.channels():
         if search_channel_name and channel.name() != search_channel_name:
             continue
-        all_programmes = channel.get_programmes_per_day()
+        all_programmes = channel.get_programmes_per_day(ctx)
         search_results.extend(
             _filter_programmes(
-                all_programmes, search_title, date_filter, channel.name()
+                all_programmes, search_title, date_filter, channel.name(), ctx
             )
         )
     return search_results
 
 
-def _filter_programmes(all_programmes, search_title, date_filter, channel_name):
+def _filter_programmes(all_programmes, search_title, date_filter, channel_name, ctx):
     """Filter programs based on the search criteria."""
     results = []
     for day in ["today", "tomorrow"]:
         if date_filter in [day, "any"]:
             for programme in all_programmes.get(day, []).values():
                 if re.search(search_title, programme.get("title", "").lower()):
-                    results.append(_format_programme(programme, day, channel_name))
+                    results.append(
+                        _format_programme(programme, day, channel_name, ctx)
+                    )
     return results
 
 
-def _format_programme(programme, day, channel_name):
+def _format_programme(programme, day, channel_name, ctx: TickContext):
     """Format a program into a result dictionary."""
     hour, minute = map(int, programme.get("start").split(":"))
-    start_datetime_iso = (
-        (datetime.datetime.now() + timedelta(days=1 if day == "tomorrow" else 0))
-        .replace(hour=hour, minute=minute, second=0, microsecond=0)
-        .isoformat()
-    )
+    date = ctx.today + timedelta(1 if day == "tomorrow" else 0)
+    start_datetime_iso = datetime.datetime.combine(
+        date, datetime.time(hour, minute)
+    ).isoformat()
     return {
         "channel_name": channel_name,
         "title": programme.get("title"),
         "description": programme.get("desc") or "No description",
         "start_time": programme.get("start"),
         "end_time": programme.get("end"),
-        "date": datetime.date.today() + timedelta(1 if day == "tomorrow" else 0),
+        "date": date,
         "start_datetime_iso": start_datetime_iso,
     }
 
 
-def read_file(file):
-    with open(file, "r") as guide_file:
-        content = guide_file.readlines()
-    content = "".join(content)
-    return content
+def _merge_and_diff(guide: Guide | None, guides: list[Guide]):
+    """Merge the source guides and diff the result against guide.
+
+    A single source is used as is. Returns the merged guide and the delta
+    to apply to guide, or None if there is no guide yet.
+    """
+    merged = guides[0] if len(guides) == 1 else Guide.merged(guides)
+    if guide is None:
+        return merged, None
+    return merged, guide.diff(merged)
 
 
-def write_file(file, data):
-    with open(file, "w") as file:
-        file.write(data)
-        file.close()
+def _get_mtime(file) -> float | None:
+    """Return the modification time of file, or None if it is missing."""
+    try:
+        return os.path.getmtime(file)
+    except OSError:
+        return None
+
+
+def _get_mtimes(files) -> list[float | None]:
+    """Return the modification times of files in one executor job."""
+    return [_get_mtime(file) for file in files]
+
+
+def load_cache(
+    file, selected_channels, time_zone, ignore_offset, parse_stale
+) -> tuple[float | None, Guide | None]:
+    """Stat a guide file and parse it if it is usable.
+
+    A file older than CACHE_MAX_AGE is only parsed when parse_stale is set.
+    Returns the modification time (None if missing) and the parsed guide.
+    """
+    mtime = _get_mtime(file)
+    if mtime is None:
+        return None, None
+    if not parse_stale and time.time() - mtime > CACHE_MAX_AGE.total_seconds():
+        return mtime, None
+    return mtime, parse_file(file, selected_channels, time_zone, ignore_offset)
+
+
+def parse_file(file, selected_channels, time_zone, ignore_offset) -> Guide | None:
+    """Parse a cached guide file straight from a read-only memory map."""
+    with open(file, "rb") as guide_file:
+        if os.fstat(guide_file.fileno()).st_size == 0:
+            return None
+        with mmap.mmap(guide_file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            return Guide(data, selected_channels, time_zone, ignore_offset)
+
+
+def write_file(file, data: bytes | bytearray) -> str:
+    """Write data to a temporary file next to file and fsync it.
+
+    The cache itself is left untouched until commit_file is called.
+    """
+    os.makedirs(os.path.dirname(file), exist_ok=True)
+    tmp_path = f"{file}.tmp"
+    with open(tmp_path, "wb") as guide_file:
+        guide_file.write(data)
+        guide_file.flush()
+        os.fsync(guide_file.fileno())
+    return tmp_path
+
+
+def commit_file(tmp_path, file):
+    """Atomically swap a written temporary file into place."""
+    os.replace(tmp_path, file)
+    # Persist the rename itself; directories cannot be opened on Windows
+    with suppress(OSError):
+        dir_fd = os.open(os.path.dirname(file), os.O_RDONLY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+
+
+def discard_file(tmp_path):
+    """Remove a temporary file whose content was rejected."""
+    with suppress(FileNotFoundError):
+        os.remove(tmp_path)
 
 
 class ChannelSensor(CoordinatorEntity[EpgDataUpdateCoordinator], SensorEntity):
@@ -361,6 +1146,8 @@ class ChannelSensor(CoordinatorEntity[EpgDataUpdateCoordinator], SensorEntity):
 
     _attr_icon: str = ICON
     _attr_has_entity_name = False
+    # The schedule can be large; keep it out of the recorder database
+    _unrecorded_attributes = frozenset({"today", "tomorrow"})
 
     def __init__(
         self,
@@ -375,18 +1162,18 @@ class ChannelSensor(CoordinatorEntity[EpgDataUpdateCoordinator], SensorEntity):
 
         self._channel_id = channel_id
         self._channel_name = channel_name  # Keep original name for reference if needed
-        self._config_options = config_options
 
         # Set unique ID and device info if you have a device associated with the config entry
         self._attr_unique_id = f"{coordinator.config_entry.entry_id}_{self._channel_id}"
         # Example device info - link sensor to the config entry's device
         self._attr_device_info = {
             "identifiers": {(DOMAIN, coordinator.config_entry.entry_id)},
-            "name": f"EPG {config_options.get('file_name', coordinator.config_entry.entry_id)}",
+            "name": f"EPG {coordinator.config_entry.title}",
             "manufacturer": "Open-EPG",  # Or your integration name
             "entry_type": "service",  # Or DEVICE_INFO_ENTRY_TYPE_SERVICE if imported
         }
         self._attr_name = f"{channel_name}"
+        self._state_key = None
 
     @property
     def _channel_data(self) -> Guide.Channel | None:
@@ -395,6 +1182,35 @@ class ChannelSensor(CoordinatorEntity[EpgDataUpdateCoordinator], SensorEntity):
             return self.coordinator.data.get_channel_by_id(self._channel_id)
         return None
 
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Write state only if the channel changed or its programme moved on."""
+        channel = self._channel_data
+        tick = self._tick
+        state_key = (
+            self.available,
+            channel.state_key(tick) if channel and tick else None,
+        )
+        changed = self.coordinator.changed_channels
+        if (
+            changed is not None
+            and self._channel_id not in changed
+            and state_key == self._state_key
+        ):
+            return
+        self._state_key = state_key
+        super()._handle_coordinator_update()
+
+    @property
+    def _config_options(self):
+        """Return the current options, which can change without a reload."""
+        return self.coordinator.config_options
+
+    @property
+    def _tick(self) -> TickContext | None:
+        """Return the instant shared by all sensors for this update."""
+        return self.coordinator.tick
+
     @property
     def available(self) -> bool:
         """Return True if coordinator has data and channel exists."""
@@ -405,7 +1221,7 @@ class ChannelSensor(CoordinatorEntity[EpgDataUpdateCoordinator], SensorEntity):
         """Return the state of the device."""
         channel = self._channel_data
         if channel:
-            current_title = channel.get_current_title()
+            current_title = channel.get_current_title(self._tick)
             return (
                 current_title if current_title is not None else "Unavailable"
             )  # Or None
@@ -418,16 +1234,18 @@ class ChannelSensor(CoordinatorEntity[EpgDataUpdateCoordinator], SensorEntity):
         if not channel:
             return None
 
+        started = time.perf_counter()
+        tick = self._tick
         if self._config_options.get("full_schedule"):
-            ret = channel.get_programmes_per_day()
+            ret = channel.get_programmes_per_day(tick)
         else:
-            ret = channel.get_programmes_for_today()
+            ret = channel.get_programmes_for_today(tick)
 
         # Ensure 'desc' key exists even if description is None
-        ret["desc"] = channel.get_current_desc() or "No description"
-        ret["sub_title"] = channel.get_current_subtitle() or "No subtitle"
+        ret["desc"] = channel.get_current_desc(tick) or "No description"
+        ret["sub_title"] = channel.get_current_subtitle(tick) or "No subtitle"
         # Add next program info?
-        next_prog = channel.get_next_programme()
+        next_prog = channel.get_next_programme(tick)
         if next_prog:
             ret["next_program_title"] = next_prog.title
             ret["next_program_start_time"] = next_prog.start_hour
@@ -442,4 +1260,131 @@ class ChannelSensor(CoordinatorEntity[EpgDataUpdateCoordinator], SensorEntity):
         ret["channel_display_name"] = channel.name()
         ret["channel_icon"] = channel.icon()
 
+        _apply_attribute_budget(
+            ret,
+            self._config_options.get("max_programmes", 0),
+            self._config_options.get("max_description_length", 0),
+        )
+        self.coordinator.stats.record_attribute_build(time.perf_counter() - started)
         return ret
+
+
+def _truncate(text, max_length: int):
+    """Shorten text to max_length characters, marking the cut."""
+    if not max_length or not isinstance(text, str) or len(text) <= max_length:
+        return text
+    return text[: max_length - 1] + "…"
+
+
+def _apply_attribute_budget(ret: dict, max_programmes: int, max_desc: int) -> None:
+    """Bound the schedule attributes in place; 0 disables a limit."""
+    remaining = max_programmes
+    for day in ("today", "tomorrow"):
+        schedule = ret.get(day)
+        if not schedule:
+            continue
+        if max_programmes:
+            # Keep the earliest programmes, today's before tomorrow's
+            schedule = dict(list(schedule.items())[:remaining])
+            remaining -= len(schedule)
+            ret[day] = schedule
+        if max_desc:
+            ret[day] = {
+                start: {**programme, "desc": _truncate(programme["desc"], max_desc)}
+                for start, programme in schedule.items()
+            }
+    if max_desc:
+        for key in ("desc", "next_program_desc"):
+            if key in ret:
+                ret[key] = _truncate(ret[key], max_desc)
+
+
+# key, name, unit, icon
+DIAGNOSTIC_SENSORS: Final = (
+    ("download_bytes", "Download size", UnitOfInformation.BYTES, "mdi:download"),
+    ("download_seconds", "Download time", UnitOfTime.SECONDS, "mdi:timer-outline"),
+    ("parse_seconds", "Parse time", UnitOfTime.SECONDS, "mdi:timer-cog-outline"),
+    ("programmes_parsed", "Programmes parsed", None, "mdi:format-list-numbered"),
+    (
+        "attribute_build_seconds",
+        "Attribute build time",
+        UnitOfTime.SECONDS,
+        "mdi:timer-sand",
+    ),
+)
+
+
+class EpgDiagnosticSensor(CoordinatorEntity[EpgDataUpdateCoordinator], SensorEntity):
+    """Exposes one coordinator performance counter as a diagnostic sensor."""
+
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_entity_registry_enabled_default = False
+    _attr_state_class = SensorStateClass.MEASUREMENT
+    _attr_has_entity_name = False
+
+    def __init__(self, coordinator: EpgDataUpdateCoordinator, description) -> None:
+        """Initialize the sensor."""
+        super().__init__(coordinator)
+        key, name, unit, icon = description
+        self._key = key
+        entry = coordinator.config_entry
+        self._attr_unique_id = f"{entry.entry_id}_diagnostic_{key}"
+        self._attr_name = f"EPG {entry.title} {name}"
+        self._attr_native_unit_of_measurement = unit
+        self._attr_icon = icon
+        self._attr_device_info = {
+            "identifiers": {(DOMAIN, entry.entry_id)},
+            "name": f"EPG {entry.title}",
+            "manufacturer": "Open-EPG",
+            "entry_type": "service",
+        }
+
+    @property
+    def native_value(self):
+        """Return the latest value of the counter."""
+        value = getattr(self.coordinator.stats, self._key)
+        return round(value, 3) if isinstance(value, float) else value
+
+
+class EpgNowNextSensor(CoordinatorEntity[EpgDataUpdateCoordinator], SensorEntity):
+    """What is on now and next across every channel of an entry."""
+
+    _attr_icon: str = ICON
+    _attr_has_entity_name = False
+    # The grid lists every channel; keep it out of the recorder database
+    _unrecorded_attributes = frozenset({"channels"})
+
+    def __init__(self, coordinator: EpgDataUpdateCoordinator) -> None:
+        """Initialize the sensor."""
+        super().__init__(coordinator)
+        entry = coordinator.config_entry
+        self._attr_unique_id = f"{entry.entry_id}_now_next"
+        self._attr_name = f"EPG {entry.title} Now and Next"
+        self._attr_device_info = {
+            "identifiers": {(DOMAIN, entry.entry_id)},
+            "name": f"EPG {entry.title}",
+            "manufacturer": "Open-EPG",
+            "entry_type": "service",
+        }
+        self._version = None
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Write state only when the grid changed."""
+        version = (self.available, self.coordinator.now_next.version)
+        if version == self._version:
+            return
+        self._version = version
+        super()._handle_coordinator_update()
+
+    @property
+    def native_value(self):
+        """Return how many channels are airing a programme."""
+        return sum(
+            1 for row in self.coordinator.now_next.rows if row["current"] is not None
+        )
+
+    @property
+    def extra_state_attributes(self):
+        """Return the grid, ordered by channel name."""
+        return {"channels": self.coordinator.now_next.rows}
@@ -0,0 +1,252 @@
+"""Watchlist of programmes that fire an event when they start."""
+
+from __future__ import annotations
+
+import datetime
+import logging
+import re
+from typing import Final
+from uuid import uuid4
+
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.helpers.event import async_track_point_in_time
+from homeassistant.helpers.storage import Store
+import homeassistant.util.dt as dt_util
+
+from .const import DOMAIN, EVENT_PROGRAMME_STARTING
+from .guide_classes import Channel, Guide, Programme, TickContext
+
+_LOGGER: Final = logging.getLogger(__name__)
+
+STORAGE_VERSION: Final = 1
+
+
+class Watch:
+    """A title pattern, optionally limited to some channels."""
+
+    def __init__(self, id: str, title: str, channel_ids: list[str], regex: bool):
+        """Initialize the watch; raises re.error for an invalid pattern."""
+        self.id = id
+        self.title = title
+        self.channel_ids = channel_ids
+        self.regex = regex
+        # Compiled once, then matched against every refreshed guide
+        self.pattern = re.compile(
+            title if regex else re.escape(title), re.IGNORECASE
+        )
+
+    @classmethod
+    def from_dict(cls, data: dict) -> Watch:
+        """Create a watch from its stored form."""
+        return cls(
+            data["id"],
+            data["title"],
+            list(data.get("channel_ids", [])),
+            data.get("regex", False),
+        )
+
+    def as_dict(self) -> dict:
+        """Return the stored form of the watch."""
+        return {
+            "id": self.id,
+            "title": self.title,
+            "channel_ids": self.channel_ids,
+            "regex": self.regex,
+        }
+
+
+class Match:
+    """A programme matched by a watch, and the instant it starts."""
+
+    __slots__ = ("starts_at", "watch_id", "channel", "programme")
+
+    def __init__(
+        self,
+        starts_at: datetime.datetime,
+        watch_id: str,
+        channel: Channel,
+        programme: Programme,
+    ) -> None:
+        """Initialize the match."""
+        self.starts_at = starts_at
+        self.watch_id = watch_id
+        self.channel = channel
+        self.programme = programme
+
+    def as_dict(self) -> dict:
+        """Return the event data and service response form of the match."""
+        time_zone = self.channel._time_zone
+        return {
+            "watch_id": self.watch_id,
+            "channel_id": self.channel.id,
+            "channel_name": self.channel.name(),
+            "title": self.programme.title,
+            "sub_title": self.programme.sub_title,
+            "description": self.programme.desc,
+            "start": self.programme._start.astimezone(time_zone).isoformat(),
+            "end": self.programme._stop.astimezone(time_zone).isoformat(),
+        }
+
+
+class Watchlist:
+    """The watches of one entry and the upcoming programmes they match.
+
+    Patterns are compiled when a watch is loaded or added, and matching is
+    done once per guide refresh, only for the channels that changed. A single
+    timer is armed for the earliest match and fires an event when it starts.
+    """
+
+    def __init__(self, hass: HomeAssistant, entry_id: str) -> None:
+        """Initialize an empty watchlist."""
+        self.hass = hass
+        self.entry_id = entry_id
+        self._store = Store(hass, STORAGE_VERSION, f"{DOMAIN}.watchlist.{entry_id}")
+        self.watches: dict[str, Watch] = {}
+        self._guide: Guide | None = None
+        self._matches: dict[str, list[Match]] = {}
+        self.timeline: list[Match] = []
+        self._unsub_timer: CALLBACK_TYPE | None = None
+
+    async def async_load(self) -> None:
+        """Load the stored watches."""
+        data = await self._store.async_load() or {}
+        for item in data.get("watches", []):
+            try:
+                watch = Watch.from_dict(item)
+            except (KeyError, re.error) as err:
+                _LOGGER.warning("Ignoring invalid watch %s: %s", item, err)
+                continue
+            self.watches[watch.id] = watch
+
+    async def async_remove(self) -> None:
+        """Delete the stored watches of a removed entry."""
+        await self._store.async_remove()
+
+    async def async_add(
+        self, title: str, channel_ids=(), regex=False, watch_id: str | None = None
+    ) -> Watch:
+        """Add a watch; raises re.error if the pattern does not compile.
+
+        Pass watch_id to give the watch the same id in several entries.
+        """
+        watch = Watch.from_dict(
+            {
+                "id": watch_id or uuid4().hex,
+                "title": title,
+                "channel_ids": list(channel_ids),
+                "regex": regex,
+            }
+        )
+        self.watches[watch.id] = watch
+        await self._async_save()
+        self._rematch(None)
+        return watch
+
+    async def async_remove_watch(self, watch_id: str) -> bool:
+        """Remove a watch; return False if it does not exist."""
+        if self.watches.pop(watch_id, None) is None:
+            return False
+        await self._async_save()
+        self._rematch(None)
+        return True
+
+    async def _async_save(self) -> None:
+        await self._store.async_save(
+            {"watches": [watch.as_dict() for watch in self.watches.values()]}
+        )
+
+    @callback
+    def async_update(self, guide: Guide | None, ctx: TickContext | None, changed):
+        """Match a refreshed guide; changed None means every channel changed."""
+        if guide is not self._guide:
+            # A new guide object shares no channels with the old one
+            changed = None
+        self._guide = guide
+        if guide is None or ctx is None:
+            self._matches = {}
+            self._rebuild_timeline()
+            return
+        if changed is None or changed:
+            self._rematch(changed, ctx)
+
+    def _rematch(self, changed, ctx: TickContext | None = None) -> None:
+        """Recompute the matches of the changed channels."""
+        guide = self._guide
+        if guide is None:
+            return
+        ctx = ctx or guide.tick_context()
+        if changed is None:
+            self._matches = {}
+            changed = [channel.id for channel in guide.channels()]
+        for channel_id in changed:
+            channel = guide.get_channel_by_id(channel_id)
+            matches = self._match_channel(channel, ctx) if channel else []
+            if matches:
+                self._matches[channel_id] = matches
+            else:
+                self._matches.pop(channel_id, None)
+        self._rebuild_timeline()
+
+    def _match_channel(self, channel: Channel, ctx: TickContext) -> list[Match]:
+        """Return the upcoming programmes of a channel that a watch matches."""
+        watches = [
+            watch
+            for watch in self.watches.values()
+            if not watch.channel_ids or channel.id in watch.channel_ids
+        ]
+        if not watches:
+            return []
+        now = ctx.shifted_now
+        return [
+            # Programme times are shifted like "now", so unshift them
+            Match(programme._start - ctx.offset, watch.id, channel, programme)
+            for programme in channel._programmes
+            if programme._start > now
+            for watch in watches
+            if watch.pattern.search(programme.title)
+        ]
+
+    def _rebuild_timeline(self) -> None:
+        """Sort the matches of every channel and re-arm the timer."""
+        now = dt_util.utcnow()
+        self.timeline = sorted(
+            (
+                match
+                for matches in self._matches.values()
+                for match in matches
+                if match.starts_at > now
+            ),
+            key=lambda match: match.starts_at,
+        )
+        self._arm()
+
+    def _arm(self) -> None:
+        """Arm the single timer for the earliest upcoming match."""
+        self.async_stop()
+        if self.timeline:
+            self._unsub_timer = async_track_point_in_time(
+                self.hass, self._async_fire, self.timeline[0].starts_at
+            )
+
+    @callback
+    def _async_fire(self, now: datetime.datetime) -> None:
+        """Fire an event for every match that has started."""
+        self._unsub_timer = None
+        index = 0
+        while index < len(self.timeline) and self.timeline[index].starts_at <= now:
+            match = self.timeline[index]
+            _LOGGER.debug("Watched programme starting: %s", match.programme.title)
+            self.hass.bus.async_fire(
+                EVENT_PROGRAMME_STARTING,
+                {"entry_id": self.entry_id, **match.as_dict()},
+            )
+            index += 1
+        del self.timeline[:index]
+        self._arm()
+
+    @callback
+    def async_stop(self) -> None:
+        """Cancel the armed timer."""
+        if self._unsub_timer:
+            self._unsub_timer()
+            self._unsub_timer = None
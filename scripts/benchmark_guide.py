@@ -0,0 +1,102 @@
+"""Time how long the integration takes to parse an XMLTV guide.
+
+Also reports the memory the parsed guide holds, and how many programme
+records and description strings it shares between channels.
+
+Download a country file, for example
+https://www.open-epg.com/files/unitedkingdom1.xml, then run
+
+    python scripts/benchmark_guide.py unitedkingdom1.xml
+
+on two checkouts to compare them. Only guide_classes.py is loaded, so
+Home Assistant does not need to be installed; lxml and pytz do.
+"""
+
+from __future__ import annotations
+
+import argparse
+import importlib.util
+import logging
+from pathlib import Path
+import time
+import tracemalloc
+
+import pytz
+
+GUIDE_CLASSES = (
+    Path(__file__).resolve().parent.parent
+    / "custom_components"
+    / "epg"
+    / "guide_classes.py"
+)
+
+
+def load_guide_classes():
+    """Import guide_classes.py without importing the integration package."""
+    spec = importlib.util.spec_from_file_location("guide_classes", GUIDE_CLASSES)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def main() -> None:
+    """Parse the guide a few times and print the fastest run and its size."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("guide", help="path to an XMLTV file")
+    parser.add_argument("--repeat", type=int, default=5, help="parses to time")
+    parser.add_argument(
+        "--channels",
+        nargs="+",
+        default="ALL",
+        help="display names of the channels to keep (default: all)",
+    )
+    parser.add_argument("--time-zone", default="UTC")
+    parser.add_argument(
+        "--debug",
+        action="store_true",
+        help="enable debug logging (discarded) as with logger: debug",
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    if args.debug:
+        logger = logging.getLogger("guide_classes")
+        logger.setLevel(logging.DEBUG)
+        logger.propagate = False
+        logger.addHandler(logging.NullHandler())
+
+    guide_classes = load_guide_classes()
+    time_zone = pytz.timezone(args.time_zone)
+    # Every version of the parser accepts a str
+    source = Path(args.guide).read_text(encoding="utf-8")
+
+    timings = []
+    for _ in range(args.repeat):
+        started = time.perf_counter()
+        guide = guide_classes.Guide(source, args.channels, time_zone)
+        timings.append(time.perf_counter() - started)
+
+    # Measured apart from the timed runs, which tracing would slow down
+    del guide
+    tracemalloc.start()
+    guide = guide_classes.Guide(source, args.channels, time_zone)
+    held, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    programmes = [
+        programme for channel in guide.channels() for programme in channel._programmes
+    ]
+    print(f"channels:    {len(guide.channels())}")
+    print(f"programmes:  {len(programmes)}")
+    print(f"records:     {len({id(programme) for programme in programmes})}")
+    print(
+        "descriptions: "
+        f"{len({id(programme.desc) for programme in programmes})} strings for "
+        f"{len({programme.desc for programme in programmes})} distinct texts"
+    )
+    print(f"parse:       {min(timings):.3f} s (best of {args.repeat})")
+    print(f"memory:      {held / 2**20:.1f} MiB held, {peak / 2**20:.1f} MiB peak")
+
+
+if __name__ == "__main__":
+    main()
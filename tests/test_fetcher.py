@@ -0,0 +1,180 @@
+"""Tests for guide downloads against a local stand-in HTTP server."""
+
+from __future__ import annotations
+
+import asyncio
+from unittest.mock import patch
+
+import aiohttp
+from aiohttp import web
+import pytest
+
+pytest.importorskip("homeassistant")
+
+from custom_components.epg import fetcher  # noqa: E402
+from custom_components.epg.fetcher import (  # noqa: E402
+    GuideFetchError,
+    GuideValidationError,
+    async_fetch_guide,
+    validate_guide,
+)
+
+
+def _guide(programmes: int = 3) -> bytes:
+    """Return a small XMLTV document with one channel."""
+    return b"".join(
+        [
+            b'<?xml version="1.0" encoding="UTF-8"?>\n<tv>\n',
+            b'<channel id="a"><display-name>A</display-name></channel>\n',
+            *(
+                b'<programme start="202501010%d0000 +0000" '
+                b'stop="202501010%d0000 +0000" channel="a">'
+                b"<title>P</title></programme>\n" % (hour, hour + 1)
+                for hour in range(programmes)
+            ),
+            b"</tv>\n",
+        ]
+    )
+
+
+GUIDE = _guide()
+
+
+@pytest.fixture(autouse=True)
+def no_backoff():
+    """Retry straight away."""
+    with patch.object(fetcher, "_backoff", return_value=0):
+        yield
+
+
+def _fetch(handler, **kwargs):
+    """Serve handler on a local port and fetch the guide from it."""
+
+    async def run():
+        app = web.Application()
+        app.router.add_get("/guide.xml", handler)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        port = runner.addresses[0][1]
+        try:
+            async with aiohttp.ClientSession() as session:
+                return await async_fetch_guide(
+                    session, f"http://127.0.0.1:{port}/guide.xml", **kwargs
+                )
+        finally:
+            await runner.cleanup()
+
+    return asyncio.run(run())
+
+
+def _flaky(*handlers):
+    """Return a handler answering with each of handlers in turn."""
+    calls = iter(handlers)
+
+    async def handler(request):
+        return await next(calls)(request)
+
+    return handler
+
+
+async def _ok(request):
+    return web.Response(body=GUIDE)
+
+
+async def _truncated(request):
+    return web.Response(body=GUIDE[: len(GUIDE) // 2])
+
+
+async def _unavailable(request):
+    return web.Response(status=503)
+
+
+async def _not_found(request):
+    return web.Response(status=404)
+
+
+async def _slow(request):
+    response = web.StreamResponse()
+    await response.prepare(request)
+    await response.write(GUIDE[:10])
+    await asyncio.sleep(1)
+    await response.write(GUIDE[10:])
+    return response
+
+
+def test_good_response():
+    """A complete guide is returned with its counts."""
+    result = _fetch(_ok)
+    assert bytes(result.data) == GUIDE
+    assert not result.not_modified
+    assert result.attempts == 1
+    assert (result.channels, result.programmes) == (1, 3)
+
+
+def test_truncated_response_is_retried():
+    """A truncated body fails validation and is downloaded again."""
+    result = _fetch(_flaky(_truncated, _ok))
+    assert result.attempts == 2
+    assert bytes(result.data) == GUIDE
+
+
+def test_truncated_response_gives_up():
+    """A body that stays truncated raises after the last attempt."""
+    with pytest.raises(GuideFetchError, match="truncated"):
+        _fetch(_truncated, attempts=2)
+
+
+def test_server_error_then_ok():
+    """A 503 is retried."""
+    result = _fetch(_flaky(_unavailable, _ok))
+    assert result.attempts == 2
+
+
+def test_not_found_is_not_retried():
+    """A 404 fails straight away."""
+    handler = _flaky(_not_found, _ok)
+    with pytest.raises(GuideFetchError, match="404"):
+        _fetch(handler)
+
+
+def test_not_modified():
+    """A 304 answer to If-Modified-Since returns no data."""
+
+    async def handler(request):
+        if request.headers.get("If-Modified-Since"):
+            return web.Response(status=304)
+        return web.Response(body=GUIDE)
+
+    result = _fetch(handler, if_modified_since="Mon, 01 Jan 2025 00:00:00 GMT")
+    assert result.not_modified
+    assert result.data is None
+
+
+def test_oversized_response():
+    """A body over max_bytes is refused without retrying."""
+    with pytest.raises(GuideFetchError, match="limit"):
+        _fetch(_flaky(_ok), max_bytes=len(GUIDE) - 1)
+
+
+def test_too_few_programmes():
+    """A guide with far fewer programmes than expected is rejected."""
+    with pytest.raises(GuideFetchError, match="programmes"):
+        _fetch(_ok, min_programmes=10, attempts=1)
+
+
+def test_slow_response_hits_read_timeout():
+    """A server that stops sending data times out and is retried."""
+    with patch.object(fetcher, "FETCH_READ_TIMEOUT", 0.2):
+        result = _fetch(_flaky(_slow, _ok))
+        assert result.attempts == 2
+        with pytest.raises(GuideFetchError, match="after 1 attempts"):
+            _fetch(_slow, attempts=1)
+
+
+def test_validate_guide_accepts_bytearray():
+    """The downloaded buffer is validated without converting it."""
+    assert validate_guide(bytearray(GUIDE)) == (1, 3)
+    with pytest.raises(GuideValidationError):
+        validate_guide(bytearray(GUIDE[:-8]))